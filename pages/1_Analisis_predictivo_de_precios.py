@@ -7,8 +7,6 @@ from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import os
-import joblib
-import json
 import sys
 
 print(os.path.dirname(__file__))
@@ -16,16 +14,21 @@ print(os.path.dirname(__file__))
 sys.path.append(os.path.dirname(__file__))
 
 from utils import *
-
-
-with open('model_config_v2.json', 'r', encoding='utf-8') as archivo:
-    # 3. Usar json.load() para convertir el contenido del archivo en un diccionario de Python
-    datos = json.load(archivo)
-
-    # Acceder a las listas y al valor por su clave
-    locations = datos['locations']
-    buildings = datos['buildings']
-    rmse_train = datos['average_rmse']
+from utils.model_registry import get_model, mostrar_modelos_cargados, registry
+from utils.bulk_scoring import FEATURE_COLUMNS, count_rows, missing_columns, score_csv
+from utils.intervals import load_intervals
+from utils.fast_scorer import get_fast_scorer
+from utils.inference_service import DEFAULT_TIMEOUT, get_service, mostrar_servicios
+from utils.prediction_cache import mostrar_cache, price_cache
+from utils.normalization import get_vocabulary
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
+
+
+# Vocabulario del modelo, indexado una sola vez por proceso
+vocabulary = get_vocabulary('model_config_v2.json')
+locations = vocabulary.locations.names
+buildings = vocabulary.buildings.names
+rmse_train = vocabulary.average_rmse
 st.title("🏠 Predicción de Precios de Propiedades")
 
 st.set_page_config(
@@ -35,24 +38,24 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+start_run("Análisis predictivo de precios")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 mostrar_sidebar_footer()
+mostrar_perfil()
 
 
 
-####################
-####################
-####################
-# Borrar al corregir
-import __main__
-
-__main__.to_lowercase = to_lowercase  # 👈 Hack temporal
-####################
-####################
-####################
-
-model_pipeline = joblib.load('real_estate_model_pipeline_v2.pkl')
+with profile_stage("carga de modelo"):
+    # El registro deserializa el pipeline una sola vez por proceso
+    model_pipeline = get_model('real_estate_model_pipeline_v2.pkl')
+    # Ruta rápida: el preprocesamiento aplanado en tablas, sin DataFrame por predicción
+    fast_scorer = get_fast_scorer('real_estate_model_pipeline_v2.pkl')
+    # Las predicciones individuales de todas las sesiones se agrupan en micro-lotes
+    price_service = get_service('precios', fast_scorer.predict, registry.version('real_estate_model_pipeline_v2.pkl'))
+mostrar_modelos_cargados()
+mostrar_servicios()
+interval_table = load_intervals('real_estate_model_pipeline_v2.pkl')
 
 st.markdown("""
             > ℹ️ **Prueba de concepto que combina modelos de ML y data del mercado local para predecir el valor de tu propiedad en Panamá. Ajusta características y obtén al instante un precio estimado junto a su intervalo de confianza al 95%.**
@@ -132,33 +135,39 @@ with col3:
 if st.button(button_label):
     # Creamos un diccionario para asegurar que los nombres de las columnas son correctos.
     input_data = {
-        'has_photos': [photos_input],
-        'location': [location_input],
-        'building': [building_input],
-        'bathrooms': [bathroom_input],
-        'has_pool': [pool_input],
-        #'commercial': [commercial_input],
-        'bedrooms': [bedroom_input],
-        'size_m2': [size_input],
-        'parking_spaces': [parking_spaces_input]
+        'has_photos': photos_input,
+        'location': location_input,
+        'building': building_input,
+        'bathrooms': bathroom_input,
+        'has_pool': pool_input,
+        #'commercial': commercial_input,
+        'bedrooms': bedroom_input,
+        'size_m2': size_input,
+        'parking_spaces': parking_spaces_input
     }
-    input_df = pd.DataFrame(input_data)
 
     # Es buena práctica aplicar la misma transformación de minúsculas que en el entrenamiento.
     #input_df = to_lowercase(input_df)
 
-    # Realizar la predicción
-    predicted_price = model_pipeline.predict(input_df)[0]
+    # Realizar la predicción (mismo resultado que model_pipeline.predict).
+    # Las configuraciones repetidas se responden desde la caché.
+    with profile_stage("predicción"):
+        predicted_price = price_cache.get_or_compute(
+            input_data,
+            # Si el servicio no responde (o fue reemplazado por un modelo nuevo), se predice directo
+            lambda: price_service.predict([input_data], timeout=DEFAULT_TIMEOUT, fallback=fast_scorer.predict)[0],
+            registry.version('real_estate_model_pipeline_v2.pkl'),
+        )
 
     # Mostrar el resultado de forma destacada.
     #st.markdown(f"El precio estimado es: **${predicted_price:,.2f}**")
 
-    confidence_level = 0.95
-    alpha = 1 - confidence_level
-
-    t_value = 1.96 
-
-    margin_of_error = t_value * 10000#rmse_train
+    if interval_table is not None:
+        # Margen calibrado para la zona y el tamaño de la propiedad
+        margin_of_error = interval_table.margin([location_input], [size_input])[0]
+    else:
+        # Sin calibración: aproximación normal con el RMSE del entrenamiento
+        margin_of_error = 1.96 * rmse_train
     lower_bound = predicted_price - margin_of_error
     upper_bound = predicted_price + margin_of_error
 
@@ -171,3 +180,64 @@ if st.button(button_label):
     col1.metric("📈 Estimado", f"${predicted_price:,.2f}")
     col2.metric("⬇️ Límite Inferior", f"${lower_bound:,.2f}")
     col3.metric("⬆️ Límite Superior", f"${upper_bound:,.2f}")
+
+mostrar_cache()
+
+
+st.divider()
+st.subheader("Valoración masiva de portafolio (CSV)")
+st.write(f"Sube un archivo CSV con las columnas: {', '.join(f'`{c}`' for c in FEATURE_COLUMNS)}.")
+
+portfolio_file = st.file_uploader("Archivo de propiedades", type="csv")
+
+if portfolio_file is not None:
+    missing = missing_columns(portfolio_file)
+    if missing:
+        st.error(f"Faltan columnas requeridas: {', '.join(missing)}")
+    elif st.button("Valorar portafolio"):
+        total_rows = count_rows(portfolio_file)
+        progress_bar = st.progress(0.0, text="Valorando propiedades...")
+
+        def update_progress(report):
+            progress_bar.progress(
+                min(report.rows / max(total_rows, 1), 1.0),
+                text=f"{report.rows:,} / {total_rows:,} propiedades ({report.rows_per_second:,.0f} filas/s)"
+            )
+
+        with profile_stage("valoración masiva"):
+            scored_file, report = score_csv(
+                portfolio_file, fast_scorer, vocabulary.locations, vocabulary.buildings,
+                intervals=interval_table, margin_of_error=1.96 * rmse_train, on_progress=update_progress
+            )
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Propiedades valoradas", f"{report.rows:,}")
+        col2.metric("Tiempo", f"{report.seconds:.2f} s")
+        col3.metric("Filas por segundo", f"{report.rows_per_second:,.0f}")
+
+        if report.corrections:
+            with st.expander(f"{len(report.corrections)} nombres corregidos automáticamente"):
+                st.dataframe(
+                    pd.DataFrame(list(report.corrections.items()), columns=["Original", "Corregido"]),
+                    hide_index=True,
+                )
+        if report.invalid_numeric:
+            st.warning(
+                "Valores no numéricos (se valoran como faltantes; ver la columna `valores_numericos_validos`): "
+                + ", ".join(f"{column}: {count:,} fila(s)" for column, count in report.invalid_numeric.items())
+            )
+        if report.unknown_locations or report.unknown_buildings:
+            st.warning(
+                "Valores fuera del vocabulario del modelo (se valoran sin esa característica): "
+                f"zonas {sorted(report.unknown_locations)[:10]}, edificios {sorted(report.unknown_buildings)[:10]}"
+            )
+
+        st.download_button(
+            "Descargar portafolio valorado",
+            data=scored_file,
+            file_name="portafolio_valorado.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+finish_run()
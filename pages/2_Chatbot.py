@@ -1,9 +1,11 @@
 import streamlit as st 
 import requests
 from utils import *
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
 import os
 import json
 
+start_run("Chatbot")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 
@@ -39,6 +41,7 @@ st.title("🤖 Chat con Asistente")
 
 
 mostrar_sidebar_footer()
+mostrar_perfil()
 
 # Muestra historial de conversación
 if "chat_history" not in st.session_state:
@@ -61,15 +64,18 @@ if prompt := st.chat_input("Escribe tu pregunta..."):
         with st.spinner("Pensando..."):
             try:
                 # Enviar a n8n
-                response = requests.post(
-                    WEBHOOK_URL,
-                    json={"chatInput": prompt,"sessionId": session_id},
-                    timeout=30
-                )
+                with profile_stage("webhook n8n"):
+                    response = requests.post(
+                        WEBHOOK_URL,
+                        json={"chatInput": prompt,"sessionId": session_id},
+                        timeout=30
+                    )
 
                 reply = response.json().get("output", "Lo siento, no pude procesar tu solicitud.")
             except Exception as e:
                 reply = f"Error al contactar al agente IA: {str(e)}"
 
             st.markdown(reply)
-            st.session_state.chat_history.append({"role": "assistant", "content": reply})
\ No newline at end of file
+            st.session_state.chat_history.append({"role": "assistant", "content": reply})
+
+finish_run()
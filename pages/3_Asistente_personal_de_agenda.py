@@ -1,10 +1,12 @@
 import streamlit as st 
 import requests
 from utils import *
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
 import json
 import uuid  # Importar la librería uuid
 import os
 
+start_run("Asistente personal de agenda")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 
@@ -47,6 +49,7 @@ st.markdown("""
 
 st.divider()
 mostrar_sidebar_footer()
+mostrar_perfil()
 
 st.subheader("💬 Asistente Personal")
 col1, col2 = st.columns([3, 7])
@@ -88,11 +91,12 @@ with col1:
                 with st.spinner("Pensando..."):
                     try:
                         # Enviar a n8n
-                        response = requests.post(
-                            WEBHOOK_URL,
-                            json={"chatInput": prompt,"sessionId": session_id},
-                            timeout=30
-                        )
+                        with profile_stage("webhook n8n"):
+                            response = requests.post(
+                                WEBHOOK_URL,
+                                json={"chatInput": prompt,"sessionId": session_id},
+                                timeout=30
+                            )
                         reply = response.json().get("output", "Lo siento, no pude procesar tu solicitud.")
                     except Exception as e:
                         reply = f"Error al contactar al agente IA: {str(e)}"
@@ -122,4 +126,6 @@ with col2:
     # Mostrar el iframe con el URL dinámico y la altura ajustada
     st.markdown(f"""
         <iframe src="{iframe_url}" style="border: 0" width="100%" height="{container_height}" frameborder="0" scrolling="no"></iframe>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+finish_run()
@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
-import joblib
+import numpy as np
+import plotly.express as px
 from utils import *
+from utils.model_registry import get_model, mostrar_modelos_cargados, registry
+from utils.churn_scoring import churn_label, churn_probability, known_categories, read_customers, sensitivity_surface, top_at_risk
+from utils.inference_service import DEFAULT_TIMEOUT, get_service, mostrar_servicios
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
 
+start_run("Análisis de fidelización de clientes")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 
@@ -10,7 +16,15 @@ mostrar_sidebar_con_logo()
 # -----------------------------
 # 1. Cargar modelo
 # -----------------------------
-model_pipeline = joblib.load('churn_model.pkl')
+with profile_stage("carga de modelo"):
+    # El registro deserializa el pipeline una sola vez por proceso
+    model_pipeline = get_model('churn_model.pkl')
+    # Las consultas individuales de todas las sesiones se agrupan en micro-lotes
+    churn_service = get_service(
+        'churn', lambda customers: churn_probability(model_pipeline, customers), registry.version('churn_model.pkl')
+    )
+mostrar_modelos_cargados()
+mostrar_servicios()
 
 # -----------------------------
 # 2. Configuración de la app
@@ -66,8 +80,14 @@ new_customer = pd.DataFrame([{
 # 4. Predicción
 # -----------------------------
 if st.button("Analizar cliente"):
-    prediction = model_pipeline.predict(new_customer)[0]
-    prob = model_pipeline.predict_proba(new_customer)[0][1]
+    # Una sola pasada del modelo: la etiqueta se deriva de la probabilidad
+    with profile_stage("predicción"):
+        # Si el servicio no responde (o fue reemplazado por un modelo nuevo), se predice directo
+        prob = churn_service.predict(
+            new_customer.to_dict("records"), timeout=DEFAULT_TIMEOUT,
+            fallback=lambda customers: churn_probability(model_pipeline, customers),
+        )[0]
+    prediction = churn_label([prob])[0]
 
     if prediction == 1:
         st.error(f"⚠️ El cliente TIENE ALTA PROBABILIDAD de darse de baja ({prob:.2%}), se recomienda contactar.")
@@ -75,6 +95,98 @@ if st.button("Analizar cliente"):
         st.success(f"✅ El cliente probablemente SE MANTENDRA con nosotros: ({1-prob:.2%})")
 
     st.write("### Detalles de probabilidad")
-    st.progress(prob)
+    st.progress(float(prob))
 
-mostrar_sidebar_footer()
\ No newline at end of file
+# -----------------------------
+# 5. Sensibilidad (what-if)
+# -----------------------------
+CONTRACTS = ["Month-to-Month", "1-year", "2-year"]
+
+
+@st.cache_data
+def calcular_sensibilidad(model_version, tenure_range, charges_range, charges_step, complaints, payment_late):
+    """Malla completa evaluada en una sola llamada; se cachea por definición de malla y versión del modelo."""
+    tenures = np.arange(tenure_range[0], tenure_range[1] + 1)
+    charges = np.arange(charges_range[0], charges_range[1] + 1, charges_step)
+    surface = sensitivity_surface(model_pipeline, tenures, charges, CONTRACTS, complaints, payment_late)
+    return tenures, charges, surface
+
+
+st.divider()
+st.subheader("Sensibilidad del riesgo")
+st.write("Probabilidad de baja según antigüedad y cargos mensuales para cada tipo de contrato, "
+         "con las quejas y pagos atrasados del cliente ingresado.")
+
+if st.checkbox("Mostrar mapa de sensibilidad"):
+    with profile_stage("sensibilidad"):
+        tenures, charges, surface = calcular_sensibilidad(
+            registry.version('churn_model.pkl'), (1, 60), (30, 200), 5, complaints, payment_late
+        )
+    fig_heatmap = px.imshow(
+        surface,
+        x=tenures,
+        y=charges,
+        facet_col=0,
+        origin="lower",
+        aspect="auto",
+        zmin=0,
+        zmax=1,
+        color_continuous_scale="RdYlGn_r",
+        labels={"x": "Tenure (meses)", "y": "Cargos mensuales ($)", "color": "Prob. de baja"},
+    )
+    for annotation, contract in zip(fig_heatmap.layout.annotations, CONTRACTS):
+        annotation.text = contract
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+    st.caption(f"{surface.size:,} escenarios evaluados en una sola llamada al modelo.")
+
+# -----------------------------
+# 6. Cartera completa
+# -----------------------------
+st.divider()
+st.subheader("Análisis de cartera de clientes")
+st.write("Sube un CSV con las columnas `Tenure`, `MonthlyCharges`, `Contract`, `Complaints` y `PaymentLate` "
+         "para obtener los clientes con mayor riesgo de baja.")
+
+customers_file = st.file_uploader("Archivo de clientes", type="csv")
+
+col1, col2 = st.columns(2)
+with col1:
+    threshold = st.slider("Umbral de riesgo", min_value=0.05, max_value=0.95, value=0.5, step=0.05)
+with col2:
+    top_n = st.number_input("Clientes a listar (Top N)", min_value=10, max_value=100_000, value=100, step=10)
+
+if customers_file is not None and st.button("Analizar cartera"):
+    try:
+        customers = read_customers(customers_file, contracts=known_categories(model_pipeline, "Contract"))
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        with st.spinner("Calculando probabilidades..."), profile_stage("cartera"):
+            probabilities = churn_probability(model_pipeline, customers)
+            at_risk = churn_label(probabilities, threshold)
+            top_customers = top_at_risk(customers, probabilities, top_n)
+
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Clientes analizados", f"{len(customers):,}")
+        m2.metric("En riesgo", f"{at_risk.sum():,}")
+        m3.metric("Tasa de riesgo", f"{at_risk.mean():.1%}")
+
+        st.dataframe(
+            top_customers,
+            column_config={"ChurnProbability": st.column_config.ProgressColumn(
+                "Probabilidad de baja", min_value=0.0, max_value=1.0, format="percent")},
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.download_button(
+            "Descargar clientes en riesgo",
+            data=top_customers.to_csv(index=False),
+            file_name="clientes_en_riesgo.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+mostrar_sidebar_footer()
+mostrar_perfil()
+
+finish_run()
@@ -1,8 +1,8 @@
 import streamlit as st 
 import os
-import io
 import json
 import sys
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.io as pio
@@ -15,37 +15,79 @@ import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils import *
-
+from utils.gcs_cache import BlobCache, LocalStorageClient, mostrar_cache_datos
+from utils.columnar import read_columns
+from utils.bi_cube import SalesCube
+from utils.sales_prep import prepared_sales
+from utils.partitioned_sales import SALES_PREFIX, PartitionedHistory, mostrar_historial
+from utils.table_pagination import TablePager, mostrar_tabla_paginada
+from utils.data_sources import DataSource, load_sources, mostrar_tiempos_fuentes
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
+
+start_run("BI Cuadro de control")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 
 BUCKET_NAME = "data_quai_dev" # Nombre del bucket
 
-if os.environ['USER'] == "appuser":
-    # En Streamlit Community Cloud
-    Credentials = st.secrets["google_cloud"]["gcp_service_account"]
-    credentials = service_account.Credentials.from_service_account_info(
-        json.loads(Credentials)
-    )
-else:
-    service_account_path = os.path.join(
-        os.path.dirname(__file__), "..", "secrets", "streamlit_bucket.json"
-    )
-    credentials = service_account.Credentials.from_service_account_file(service_account_path)
 
-client = storage.Client(credentials=credentials, project=credentials.project_id)
-bucket = client.bucket(BUCKET_NAME)
+@st.cache_resource
+def get_blob_cache():
+    """Un solo cliente de Storage y una sola caché en disco para todas las sesiones."""
+    if os.environ.get("LOCAL_BUCKET_DIR"):
+        # Directorio local con un subdirectorio por bucket, para probar sin credenciales
+        return BlobCache(LocalStorageClient(os.environ["LOCAL_BUCKET_DIR"]))
+
+    if os.environ['USER'] == "appuser":
+        # En Streamlit Community Cloud
+        Credentials = st.secrets["google_cloud"]["gcp_service_account"]
+        credentials = service_account.Credentials.from_service_account_info(
+            json.loads(Credentials)
+        )
+    else:
+        service_account_path = os.path.join(
+            os.path.dirname(__file__), "..", "secrets", "streamlit_bucket.json"
+        )
+        credentials = service_account.Credentials.from_service_account_file(service_account_path)
+
+    client = storage.Client(credentials=credentials, project=credentials.project_id)
+    return BlobCache(client)
+
+
+blob_cache = get_blob_cache()
+
+
+@st.cache_resource
+def get_sales_history():
+    """Historial particionado por fecha, compartido por todas las sesiones y actualizado en forma incremental."""
+    return PartitionedHistory(blob_cache, BUCKET_NAME, SALES_PREFIX)
 
-dataframes = {}
 
-for file in ["vitalmedic_data_enriched.csv", "vitalmedic_sales_history.csv"]:
-    blob = bucket.blob(file)
+sales_history = get_sales_history()
+# Si hay particiones bajo el prefijo se usan; si no, el CSV único de siempre
+particionado = bool(sales_history.listing())
 
-    # 5️⃣ Descargar contenido del CSV como texto
-    csv_data = blob.download_as_text()
+# Solo se descarga si cambió la generación del objeto en el bucket; cada
+# generación se convierte una vez a Parquet y se leen solo las columnas necesarias;
+# mientras la generación no cambie, el frame leído se reutiliza desde memoria.
+# Las fuentes se cargan en paralelo: la espera la marca la más lenta.
+DATA_SOURCES = [
+    DataSource("vitalmedic_data_enriched.csv", lambda: read_columns(
+        blob_cache, BUCKET_NAME, "vitalmedic_data_enriched.csv",
+        columns=["ProductID", "Brand", "Cost", "Price", "StockLevel"], memoize=True,
+    )),
+]
+if not particionado:
+    DATA_SOURCES.append(DataSource("vitalmedic_sales_history.csv", lambda: read_columns(
+        blob_cache, BUCKET_NAME, "vitalmedic_sales_history.csv", memoize=True,
+    )))
+
+with profile_stage("fuentes de datos"):
+    load_report = load_sources(DATA_SOURCES)
+dataframes = load_report.frames
 
-    # 6️⃣ Leer CSV en pandas
-    dataframes[file] = pd.read_csv(io.StringIO(csv_data))  # para Python >=3.6 usar io.StringIO
+mostrar_cache_datos(blob_cache)
+mostrar_tiempos_fuentes(load_report)
 
 
 st.set_page_config(
@@ -55,32 +97,32 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-df_1 = dataframes["vitalmedic_sales_history.csv"]
 df_2 = dataframes["vitalmedic_data_enriched.csv"]
 
 #df_1 = pd.read_csv("data/vitalmedic_sales_history.csv")
 #df_2 = pd.read_csv("data/vitalmedic_data_enriched.csv")
 
-df = pd.merge(
-    df_1, 
-    df_2[["ProductID", "Brand", "Cost", "Price","StockLevel"]], 
-    on="ProductID", 
-    how="right")
-
-st.title("📉 Cuadro de Control de Inteligencia de Negocio")
-
-# Crear columna de fecha de ejemplo (puedes reemplazar con tu campo real)
-df["Date"] = pd.to_datetime(df["Date"])
 
-# Extraer el año
-df["Year"] = df["Date"].dt.year
+@st.cache_resource(max_entries=2, show_spinner=False)
+def construir_cubo(data_version, _df):
+    """Cubo Año × Trimestre × Categoría × Producto, una vez por versión de los datos."""
+    return SalesCube.build(_df)
 
-# Extraer Quarter
-df["Quarter"] = df["Date"].dt.to_period("Q").astype(str)
 
-# Calcular Revenue
-df["RevenuePotential"] = df["Price"] * df["StockLevel"]
+with profile_stage("preparación de ventas"):
+    if particionado:
+        # Solo se descargan y agregan al frame y al cubo las particiones nuevas
+        sales_history.refresh(df_2, df_2.attrs.get("version"))
+        df, cubo, data_version = sales_history.snapshot()
+        mostrar_historial(sales_history)
+    else:
+        df_1 = dataframes["vitalmedic_sales_history.csv"]
+        # Cruce y columnas derivadas (fecha, año, trimestre, revenue, margen) una vez por versión de los datos
+        data_version = (df_1.attrs.get("version"), df_2.attrs.get("version"))
+        df = prepared_sales(data_version, df_1, df_2)
+        cubo = construir_cubo(data_version, df)
 
+st.title("📉 Cuadro de Control de Inteligencia de Negocio")
 
 # Usa paletas pastel en tus gráficos
 color_sequence = px.colors.qualitative.Pastel
@@ -92,44 +134,41 @@ color_sequence = px.colors.qualitative.Pastel
 filter_1, filter_2 = st.columns([1, 3])
 with filter_1:
     with st.container(border=True):
-        anios = df["Year"].unique()
-        anio_sel = st.selectbox("Seleccionar Año", sorted(anios))
-        df_filtered = df[df["Year"] == anio_sel]
+        anio_sel = st.selectbox("Seleccionar Año", cubo.years)
 
 with filter_2:
     with st.container(border=True):
         # Selección múltiple de categorías
-        categorias = df["Category"].unique()
+        categorias = cubo.categories
         categorias_sel = st.multiselect(
             "Seleccionar Categorías",
             options=categorias,
             default=categorias  # todas seleccionadas por defecto
         )
 
-# Aplicar filtros
-df_filtered = df[(df["Year"] == anio_sel) & (df["Category"].isin(categorias_sel))].copy()
+# Métricas y gráficos salen del cubo; las filas solo se filtran para la tabla de detalle
+with profile_stage("corte del cubo"):
+    cubo_sel = cubo.slice(anio_sel, categorias_sel)
 
-# Calculando el margen
-df_filtered["Margin"] = (df_filtered["Price"] - df_filtered["Cost"])/df_filtered["Price"] * 100
 
 metric_1, metric_2, metric_3, metric_4 = st.columns(4)
 
 with metric_1:
-    st.metric("Total de Productos", df_filtered["ProductID"].unique().shape[0], delta=5)
+    st.metric("Total de Productos", cubo_sel.product_count(), delta=5)
 with metric_2:
-    st.metric("Margen Promedio", f"{df_filtered["Margin"].mean():.1f}%", delta = -1.2)
+    margen = cubo_sel.margin_mean()
+    st.metric("Margen Promedio", "—" if pd.isna(margen) else f"{margen:.1f}%", delta = -1.2)
 
 with metric_3:    
 # Producto más rentable
-    prod_rent = df_filtered.loc[(df_filtered["Price"] - df_filtered["Cost"]).idxmax()]
-    st.metric("Producto más rentable", prod_rent["ProductID"])
+    st.metric("Producto más rentable", cubo_sel.most_profitable() or "—")
 
 level1_1, level1_2, level1_3 = st.columns([1,3,2])
 
 # ==============================
 # Agregar gráfico de barras por Quarter
 # ==============================
-revenue_quarter = df_filtered.groupby("Quarter")["RevenuePotential"].sum().reset_index()
+revenue_quarter = cubo_sel.revenue_by("Quarter")
 
 with level1_1:
     fig_bar1 = px.bar(
@@ -145,10 +184,10 @@ with level1_1:
 # ==============================
 # Agregar pie chart por categoría
 # ==============================
-revenue_category = df_filtered.groupby("Category")["RevenuePotential"].sum().reset_index()
+revenue_category = cubo_sel.revenue_by("Category")
 
 with level1_2:
-    count_category = df_filtered.groupby("Category")["ProductID"].count().reset_index(name="Cantidad")
+    count_category = cubo_sel.count_by("Category")
 
     fig_pie = px.pie(
         count_category,
@@ -171,7 +210,6 @@ with level1_2:
     # ==============================
     # Barra horizontal: revenue por categoría
     # ==============================
-    revenue_category = df_filtered.groupby("Category")["RevenuePotential"].sum().reset_index()
 with level1_3:
     fig_bar2 = px.bar(
         revenue_category,
@@ -187,7 +225,7 @@ with level1_3:
     st.plotly_chart(fig_bar2, use_container_width=True)
 
 
-top_products = df_filtered.groupby("ProductName")["RevenuePotential"].sum().sort_values(ascending=False).head(10).reset_index()
+top_products = cubo_sel.top("ProductName", 10)
 fig_top = px.bar(
     top_products, 
     x="RevenuePotential", 
@@ -200,34 +238,39 @@ st.plotly_chart(fig_top, use_container_width=True)
 
 st.divider()
 
-# Selecciona las columnas y aplica formato
-df_display = df_filtered.copy()
-df_display["RevenuePotential"] = df_display["RevenuePotential"].map("${:,.2f}".format)
-df_display["Price"] = df_display["Price"].map("${:,.2f}".format)
-df_display["Cost"] = df_display["Cost"].map("${:,.2f}".format)
-df_display["Margin"] = df_display["Margin"].map("{:.1f}%".format)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def paginador_detalle(data_version, anio, categorias, _df):
+    """Filas filtradas, orden y fila de mayor revenue: una vez por combinación de filtros."""
+    mask = (_df["Year"] == anio) & (_df["Category"].isin(categorias))
+    return TablePager(_df, np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False)),
+                      highlight_column="RevenuePotential")
+
 
 # Opcional: selecciona solo las columnas más relevantes
 cols = [
     "ProductID", "ProductName", "Brand", "Category", "Date", "Quarter",
     "StockLevel", "Price", "Cost", "RevenuePotential", "Margin"
 ]
-df_display = df_display[cols]
-
-# Aplica estilos con pandas Styler
-styled_df = df_display.style\
-    .highlight_max(subset=["RevenuePotential"], color="#b7e1cd")\
-    .set_properties(**{"background-color": "#f1f3f4"}, subset=pd.IndexSlice[:, :])\
-    .set_table_styles([{
-        "selector": "th",
-        "props": [("background-color", "#e3e6ea"), ("font-weight", "bold")]
-    }])
-
-
 
+# Los valores se mantienen numéricos; el formato lo aplica column_config en el navegador
+with profile_stage("tabla de detalle"):
+    mostrar_tabla_paginada(
+        paginador_detalle(data_version, anio_sel, tuple(categorias_sel), df),
+        cols,
+        column_config={
+            "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
+            "Price": st.column_config.NumberColumn("Price", format="dollar"),
+            "Cost": st.column_config.NumberColumn("Cost", format="dollar"),
+            "RevenuePotential": st.column_config.NumberColumn("RevenuePotential", format="dollar"),
+            "Margin": st.column_config.NumberColumn("Margin", format="%.1f%%"),
+        },
+        key="detalle",
+        highlight_label="Mayor revenue",
+    )
 
-st.dataframe(styled_df, use_container_width=True, hide_index=True)
 
 
+mostrar_sidebar_footer()
+mostrar_perfil()
 
-mostrar_sidebar_footer()
\ No newline at end of file
+finish_run()
@@ -10,10 +10,13 @@ import numpy as np
 import traceback
 
 from utils import *
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
 
+start_run("Monitoreo de buques")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
 mostrar_sidebar_footer()
+mostrar_perfil()
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -114,7 +117,9 @@ col1, col2 = st.columns([1, 3])
 with col1:
     if st.button("📡 Capturar Nuevo Dato de Buque", type="primary", use_container_width=True):
         with st.spinner("Esperando un nuevo reporte de posición..."):
-            asyncio.run(fetch_and_update_dataframe())
+            with profile_stage("websocket AIS"):
+                asyncio.run(fetch_and_update_dataframe())
+            finish_run()
             st.rerun() # Forzar recarga para actualizar métricas y tabla
 
 with col2:
@@ -135,7 +140,8 @@ if not st.session_state.ships_df.empty:
     df_display["timestamp"] = pd.to_datetime(df_display["timestamp"])
     df_display["eta"] = pd.to_datetime(df_display["eta"])
 
-    st.map(df_display, latitude="latitude", longitude="longitude")
+    with profile_stage("mapa"):
+        st.map(df_display, latitude="latitude", longitude="longitude")
 
     st.subheader("Últimas posiciones registradas")
     st.dataframe(
@@ -154,3 +160,5 @@ if not st.session_state.ships_df.empty:
         use_container_width=True,
         hide_index=True
     )
+
+finish_run()
@@ -1,21 +1,25 @@
 # Importación de librerías
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 import os
 import sys
-import plotly.express as px
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils import *
+from utils.profiling import finish_run, mostrar_perfil, profile_stage, start_run
+from utils.customer_simulation import simulate_transactions
+from utils.rfm import compute_rfm
+from utils.scatter_lod import scatter_3d_lod
+from utils.clustering import MODES, K_RANGE, benchmark_matrix, compare_modes, elbow_sweep, fit_clusters, matrix_digest
 
+start_run("Análisis predictivo de clientes")
 apply_sidebar_style()
 mostrar_sidebar_con_logo()
+mostrar_perfil()
 
 # Título de la aplicación
 st.title('Prueba de Concepto de Clustering de Clientes 🇵🇦')
@@ -26,47 +30,34 @@ st.sidebar.header('Configuración del Análisis')
 num_clientes = st.sidebar.slider('Número de Clientes (Simulados)', 100, 5000, 500)
 num_transacciones = st.sidebar.slider('Número de Transacciones (Simuladas)', 1000, 50000, 5000)
 num_clusters = st.sidebar.slider('Número de Clusters (K)', 2, 10, 4)
+semilla = st.sidebar.number_input('Semilla de la simulación', min_value=0, value=42, step=1)
+modo_clustering = st.sidebar.selectbox('Modo de clustering', list(MODES), format_func=MODES.get,
+                                       help='Automático: KMeans completo hasta 50.000 clientes, MiniBatchKMeans por encima.')
 
 # Función para simular datos
-@st.cache_data
-def simular_datos(n_clientes, n_transacciones):
-    """Genera datos de transacciones de clientes de manera aleatoria."""
-    cliente_ids = [f'C{i:03}' for i in range(1, n_clientes + 1)]
-    transacciones = []
-    fechas_base = datetime.now() - timedelta(days=365)
-    
-    for _ in range(n_transacciones):
-        cliente_id = np.random.choice(cliente_ids)
-        dias_desde_compra = np.random.randint(1, 365)
-        fecha_compra = fechas_base + timedelta(days=dias_desde_compra)
-        monto = round(np.random.uniform(5.0, 500.0), 2)
-        transacciones.append([cliente_id, fecha_compra, monto])
-    
-    df = pd.DataFrame(transacciones, columns=['ID_Cliente', 'Fecha_Compra', 'Monto_Compra'])
-    df['Fecha_Compra'] = pd.to_datetime(df['Fecha_Compra'])
-    return df
+@st.cache_data(max_entries=8)
+def simular_datos(n_clientes, n_transacciones, semilla, hoy):
+    """Genera datos de transacciones de clientes de manera aleatoria, reproducibles por semilla y fecha."""
+    return simulate_transactions(n_clientes, n_transacciones, seed=semilla, today=hoy)
 
 # Generar datos y calcular RFM
 with st.spinner('Generando datos y calculando métricas RFM...'):
-    df_transacciones = simular_datos(num_clientes, num_transacciones)
+    with profile_stage("simulación"):
+        df_transacciones = simular_datos(num_clientes, num_transacciones, int(semilla), datetime.now().date())
 
-    # Calcular RFM
-    fecha_hoy = df_transacciones['Fecha_Compra'].max() + timedelta(days=1)
-    df_rfm = df_transacciones.groupby('ID_Cliente').agg({
-        'Fecha_Compra': lambda fecha: (fecha_hoy - fecha.max()).days,
-        'ID_Cliente': 'count',
-        'Monto_Compra': 'sum'
-    }).rename(columns={'Fecha_Compra': 'Recencia', 'ID_Cliente': 'Frecuencia', 'Monto_Compra': 'Monetario'})
-    df_rfm = df_rfm.reset_index()
+    # Calcular RFM: fecha máxima, cantidad y suma por cliente; la recencia se deriva contra el día siguiente a la última compra
+    with profile_stage("RFM"):
+        df_rfm = compute_rfm(df_transacciones)
 
 st.subheader('1. Datos RFM (Recencia, Frecuencia, Monetario)')
 st.write("Estas métricas se calculan a partir de las transacciones de cada cliente para describir su comportamiento de compra.")
 st.dataframe(df_rfm.head())
 
 # Escalar los datos
-scaler = StandardScaler()
-df_rfm_escalado = scaler.fit_transform(df_rfm[['Recencia', 'Frecuencia', 'Monetario']])
-df_rfm_escalado = pd.DataFrame(df_rfm_escalado, columns=['Recencia', 'Frecuencia', 'Monetario'])
+with profile_stage("escalado"):
+    scaler = StandardScaler()
+    df_rfm_escalado = scaler.fit_transform(df_rfm[['Recencia', 'Frecuencia', 'Monetario']])
+    df_rfm_escalado = pd.DataFrame(df_rfm_escalado, columns=['Recencia', 'Frecuencia', 'Monetario'])
 
 # Método del codo para el número de clusters
 st.subheader('2. Método del Codo para Encontrar K')
@@ -75,34 +66,75 @@ st.write("El método del codo ayuda a encontrar el número óptimo de clusters.
 # Crear un placeholder para el gráfico del codo
 elbow_chart_placeholder = st.empty()
 
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def barrido_codo(huella, rango_k, _matriz):
+    """Ajustes de KMeans por K en paralelo, una vez por matriz escalada (identificada por su huella) y rango de K."""
+    return elbow_sweep(_matriz, rango_k)
+
+
 if st.checkbox('Mostrar gráfico del método del codo'):
-    inercia = []
-    rango_clusters = range(1, 11)
-    for k in rango_clusters:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto') # Usar 'auto' para evitar FutureWarning
-        kmeans.fit(df_rfm_escalado)
-        inercia.append(kmeans.inertia_)
+    with profile_stage("método del codo"):
+        matriz = df_rfm_escalado.to_numpy()
+        codo = barrido_codo(matrix_digest(matriz), K_RANGE, matriz)
     
     fig, ax = plt.subplots()
-    ax.plot(rango_clusters, inercia, marker='o')
+    ax.plot(codo.ks, codo.inertias, marker='o')
+    if codo.stopped_at is not None:
+        # El barrido se detiene cuando agregar un cluster ya casi no reduce la inercia
+        ax.axvline(codo.stopped_at, color='grey', linestyle='--', linewidth=1)
     ax.set_title('Método del Codo')
     ax.set_xlabel('Número de Clusters (K)')
     ax.set_ylabel('Inercia')
     elbow_chart_placeholder.pyplot(fig, use_container_width=True)
     plt.close(fig) # Liberar memoria
+    if codo.stopped_at is not None:
+        st.caption(f"La curva se aplana en K = {codo.stopped_at}: {codo.fits} de {len(K_RANGE)} ajustes ({codo.seconds:.2f} s).")
 else:
     elbow_chart_placeholder.empty() # Limpiar el placeholder si la casilla no está marcada
     
 
 # Aplicar K-Means con el K seleccionado por el usuario
 st.subheader(f'3. Clustering con K-Means (K = {num_clusters})')
-kmeans = KMeans(n_clusters=num_clusters, random_state=42, n_init=10)
-kmeans = KMeans(n_clusters=num_clusters, random_state=42, n_init='auto')
-df_rfm['Cluster'] = kmeans.fit_predict(df_rfm_escalado)
+with profile_stage("KMeans"):
+    # Centroides según el modo y asignación de todos los clientes al más cercano
+    ajuste = fit_clusters(df_rfm_escalado.to_numpy(), num_clusters, modo_clustering)
+    df_rfm['Cluster'] = ajuste.labels
 
 st.write(f"Los clientes han sido agrupados en {num_clusters} segmentos distintos.")
+st.caption(f"{MODES[ajuste.mode]}: ajuste con {ajuste.fitted_rows:,} clientes en {ajuste.fit_seconds:.2f} s, "
+           f"asignación en {ajuste.assign_seconds:.2f} s, inercia {ajuste.inertia:,.1f}.")
 st.dataframe(df_rfm.head())
 
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def comparar_modos(n_clientes, k):
+    """Tiempo de ajuste e inercia de cada modo frente a KMeans completo, sobre clientes simulados."""
+    return compare_modes(benchmark_matrix(n_clientes), k)
+
+
+with st.expander("Modo para grandes volúmenes: comparación con KMeans completo"):
+    st.write("Con millones de clientes, los centroides se ajustan con MiniBatchKMeans o sobre una muestra "
+             "estratificada por cuantiles de R, F y M; luego todos los clientes se asignan al centroide más "
+             "cercano por bloques. La inercia se mide siempre sobre todos los clientes.")
+    n_benchmark = st.select_slider('Clientes del conjunto de prueba', [100_000, 500_000, 1_000_000, 2_000_000],
+                                   value=500_000, format_func=lambda n: f"{n:,}")
+    if st.button('Comparar modos'):
+        with st.spinner('Ajustando los tres modos...'), profile_stage("comparación de modos"):
+            comparacion = comparar_modos(n_benchmark, num_clusters)
+        st.dataframe(
+            comparacion,
+            column_config={
+                "Filas ajustadas": st.column_config.NumberColumn(format="localized"),
+                "Ajuste (s)": st.column_config.NumberColumn(format="%.3f"),
+                "Asignación (s)": st.column_config.NumberColumn(format="%.3f"),
+                "Inercia": st.column_config.NumberColumn(format="localized"),
+                "Inercia vs completo": st.column_config.NumberColumn(format="%.3f"),
+            },
+            hide_index=True,
+        )
+
+
 # Análisis y visualización
 st.subheader('4. Análisis de los Clusters')
 st.write("A continuación, se muestran las características promedio de cada segmento de clientes.")
@@ -124,12 +156,14 @@ st.markdown("""
 st.subheader('5. Visualización de los Clusters')
 st.write("Observa la distribución de los clientes en el espacio 3D de RFM. Cada color representa un cluster.")
 
-fig_3d = px.scatter_3d(df_rfm, x='Recencia', y='Frecuencia', z='Monetario',
-                        color=df_rfm['Cluster'].astype(str),
-                        title="Segmentación de Clientes (RFM)",
-                        labels={'Recencia': 'Recencia', 'Frecuencia': 'Frecuencia', 'Monetario': 'Monetario'})
-fig_3d.update_traces(marker=dict(size=4, opacity=0.8), selector=dict(mode='markers'))
-st.plotly_chart(fig_3d, use_container_width=True)
+with profile_stage("gráfico 3D"):
+    # Puntos acotados por cluster (con sus extremos) y centroides en las unidades originales
+    grafico_3d = scatter_3d_lod(df_rfm, 'Recencia', 'Frecuencia', 'Monetario', cluster_column='Cluster',
+                                centroids=scaler.inverse_transform(ajuste.centroids),
+                                title="Segmentación de Clientes (RFM)", measure_payload=True)
+    st.plotly_chart(grafico_3d.figure, use_container_width=True)
+st.caption(f"Se dibujan {grafico_3d.drawn:,} de {grafico_3d.total:,} clientes "
+           f"(carga del gráfico: {grafico_3d.payload_bytes / 1e3:,.0f} KB).")
 
 st.write("---")
 st.subheader('Próximos Pasos para tu Portafolio')
@@ -142,4 +176,6 @@ st.info("""
 - **Ofertas de reactivación** para los clientes en riesgo.
 
 **3. Despliega la Aplicación:** Una vez que tengas tu código en un repositorio de GitHub, puedes desplegarlo de manera gratuita en la [Comunidad de Streamlit Cloud](https://streamlit.io/cloud).
-""")
\ No newline at end of file
+""")
+
+finish_run()
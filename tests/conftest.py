@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Las pruebas importan `utils` como lo hace la app, desde la raíz del repositorio
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from utils.columnar import _synthetic_products, memory_profile, read_columns, stream_csv_to_parquet
+from utils.gcs_cache import BlobCache, LocalStorageClient
+
+ROWS = 20_000
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    root = tmp_path / "bucket_root"
+    (root / "bucket").mkdir(parents=True)
+    return root
+
+
+def _as_read_csv(frame):
+    """Categorías como texto y enteros de 64 bits, como los deja `pd.read_csv`."""
+    return frame.astype({c: str for c in frame.select_dtypes("category")}).astype({"StockLevel": "int64"})
+
+
+def test_streamed_frame_matches_read_csv(bucket, tmp_path):
+    path = bucket / "bucket" / "products.csv"
+    _synthetic_products(ROWS).to_csv(path, index=False)
+    cache = BlobCache(LocalStorageClient(str(bucket)), cache_dir=str(tmp_path / "cache"))
+    frame = read_columns(cache, "bucket", "products.csv")
+    pd.testing.assert_frame_equal(_as_read_csv(frame), pd.read_csv(path))
+
+
+def test_undeclared_column_that_changes_type_in_a_later_block(bucket, tmp_path):
+    # "Lote" parece numérica en el primer bloque y trae texto más adelante
+    lots = [str(i) for i in range(2000)] + ["L-2000", "sin lote"]
+    frame = _synthetic_products(len(lots)).assign(Lote=lots)
+    frame.to_csv(bucket / "bucket" / "products.csv", index=False)
+    blob = LocalStorageClient(str(bucket)).bucket("bucket").get_blob("products.csv")
+    parquet = tmp_path / "products.parquet"
+    stream_csv_to_parquet(blob, str(parquet), block_size=1 << 12)
+    assert pd.read_parquet(parquet)["Lote"].tolist() == lots
+
+
+def test_streamed_peak_memory_is_bounded_by_frame_size():
+    r = memory_profile(200_000)
+    streamed, text = r["flujo"], r["texto"]
+    assert streamed["peak_mb"] < 4 * streamed["frame_mb"]
+    assert streamed["peak_mb"] < text["peak_mb"] / 2
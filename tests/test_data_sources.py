@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from utils.data_sources import DataSource, DataSourceError, load_sources
+
+MAX_WORKERS = 2
+
+
+def _sleeping(i, seconds):
+    def load():
+        time.sleep(seconds)
+        return pd.DataFrame({"fuente": [i]})
+    return DataSource(f"fuente_{i}", load, timeout=0.3, retries=0)
+
+
+def test_queue_time_does_not_count_against_timeout():
+    # Tres tandas de 0.2 s: las últimas fuentes esperan más que su tiempo límite por un hilo libre
+    sources = [_sleeping(i, 0.2) for i in range(3 * MAX_WORKERS)]
+    report = load_sources(sources, max_workers=MAX_WORKERS)
+    assert sorted(report.frames) == sorted(s.name for s in sources)
+    assert all(t.ok and t.attempts == 1 and not t.errors for t in report.timings)
+    assert report.seconds >= 0.55
+
+
+def test_timeout_of_running_attempt_raises():
+    with pytest.raises(DataSourceError, match="tiempo límite"):
+        load_sources([_sleeping(0, 0.6)], max_workers=MAX_WORKERS)
+
+
+def test_failed_attempt_is_retried():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("fallo transitorio")
+        return pd.DataFrame()
+
+    report = load_sources([DataSource("inestable", flaky, backoff=0.01)], max_workers=MAX_WORKERS)
+    timing, = report.timings
+    assert timing.ok and timing.attempts == 2
+    assert timing.errors == ["ConnectionError: fallo transitorio"]
+
+
+def test_slow_attempt_is_not_duplicated():
+    calls = []
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            calls.append(1)
+        time.sleep(0.5)
+        return pd.DataFrame()
+
+    report = load_sources([DataSource("lenta", slow, timeout=0.2, retries=2)], max_workers=MAX_WORKERS)
+    timing, = report.timings
+    assert timing.ok and timing.attempts == 1 and len(timing.errors) == 2
+    assert len(calls) == 1
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from utils.fast_scorer import FastScorer, check_parity, sample_frame
+from utils.model_registry import registry
+
+CATEGORICAL = ["location", "building"]
+NUMERIC = ["size_m2", "bedrooms"]
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "real_estate_model_pipeline_v2.pkl")
+
+
+def _pipeline(estimator):
+    rng = np.random.default_rng(0)
+    n = 300
+    frame = pd.DataFrame({
+        "location": rng.choice(["Albrook", "Costa del Este", "Punta Pacífica"], n),
+        "building": rng.choice(["Torre A", "Torre B", "PH Central"], n),
+        "size_m2": rng.uniform(40, 300, n).round(),
+        "bedrooms": rng.integers(1, 5, n).astype(float),
+    })
+    frame.loc[rng.random(n) < 0.1, "building"] = np.nan
+    price = frame["size_m2"] * 1500 + frame["bedrooms"] * 10_000 + frame["location"].map(
+        {"Albrook": 0, "Costa del Este": 50_000, "Punta Pacífica": 90_000})
+    categorical = Pipeline([
+        ("imputer", SimpleImputer(strategy="constant", fill_value="missing")),
+        ("onehot", OneHotEncoder(handle_unknown="ignore")),
+    ])
+    pipeline = Pipeline([
+        ("preprocessor", ColumnTransformer([
+            ("cat", categorical, CATEGORICAL),
+            ("num", StandardScaler(), NUMERIC),
+        ])),
+        ("regressor", estimator),
+    ])
+    return pipeline.fit(frame, price)
+
+
+def _with_edge_cases(frame):
+    """Agrega filas con categorías desconocidas y faltantes."""
+    edges = frame.iloc[:4].copy()
+    edges["location"] = ["Zona Nueva", np.nan, frame["location"].iloc[0], "Zona Nueva"]
+    edges["building"] = [frame["building"].iloc[0], "Torre Desconocida", np.nan, np.nan]
+    return pd.concat([frame, edges], ignore_index=True)
+
+
+@pytest.fixture(scope="module", params=["lineal", "arboles"])
+def scorer(request):
+    estimator = Ridge(alpha=1.0) if request.param == "lineal" else HistGradientBoostingRegressor(random_state=0)
+    return FastScorer.from_pipeline(_pipeline(estimator))
+
+
+def test_batch_and_single_row_match_pipeline(scorer):
+    frame = _with_edge_cases(sample_frame(scorer, 200, seed=1))
+    parity = check_parity(scorer, frame)
+    assert parity["ok"], parity
+
+
+def test_unknown_and_missing_categories_row_by_row(scorer):
+    frame = _with_edge_cases(sample_frame(scorer, 5, seed=2)).iloc[-4:]
+    expected = scorer.pipeline.predict(frame)
+    for record, value in zip(frame.to_dict("records"), expected):
+        assert scorer.predict_one(record) == pytest.approx(value, rel=1e-9, abs=1e-6)
+    np.testing.assert_allclose(scorer.predict(frame), expected, rtol=1e-9, atol=1e-6)
+
+
+def test_shipped_price_model_parity():
+    scorer = FastScorer.from_pipeline(registry.get(MODEL_PATH))
+    frame = _with_edge_cases(sample_frame(scorer, 200, seed=3))
+    parity = check_parity(scorer, frame)
+    assert parity["ok"], parity
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from utils.gcs_cache import BlobCache, LocalStorageClient
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    root = tmp_path / "bucket_root"
+    (root / "bucket").mkdir(parents=True)
+    path = root / "bucket" / "ventas.csv"
+    path.write_text("a,b\n1,2\n")
+    return root, path
+
+
+def _cache(root, tmp_path, ttl=0):
+    return BlobCache(LocalStorageClient(str(root)), cache_dir=str(tmp_path / "cache"), ttl=ttl)
+
+
+def test_miss_then_hit_from_disk(bucket, tmp_path):
+    root, _ = bucket
+    cache = _cache(root, tmp_path)
+    first = cache.get("bucket", "ventas.csv")
+    second = cache.get("bucket", "ventas.csv")
+    assert (cache.misses, cache.hits, cache.revalidations) == (1, 1, 2)
+    assert second.path == first.path
+    assert open(first.path).read() == "a,b\n1,2\n"
+
+
+def test_hit_within_ttl_skips_metadata(bucket, tmp_path):
+    root, _ = bucket
+    cache = _cache(root, tmp_path, ttl=3600)
+    cache.get("bucket", "ventas.csv")
+    cache.get("bucket", "ventas.csv")
+    assert (cache.misses, cache.hits, cache.revalidations) == (1, 1, 1)
+
+
+def test_generation_change_downloads_again_and_removes_stale(bucket, tmp_path):
+    root, path = bucket
+    cache = _cache(root, tmp_path)
+    old = cache.get("bucket", "ventas.csv")
+
+    path.write_text("a,b\n3,4\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    new = cache.get("bucket", "ventas.csv")
+
+    assert new.generation != old.generation
+    assert cache.misses == 2
+    assert open(new.path).read() == "a,b\n3,4\n"
+    assert not os.path.exists(old.path)
+
+
+def test_writer_receives_transport_arguments(bucket, tmp_path):
+    root, _ = bucket
+    cache = BlobCache(LocalStorageClient(str(root)), cache_dir=str(tmp_path / "cache"), timeout=5.0)
+    received = {}
+
+    def writer(blob, path, **transport):
+        received.update(transport)
+        blob.download_to_filename(path, **transport)
+
+    cache.get("bucket", "ventas.csv", writer=writer, suffix=".copia")
+    assert received == {"timeout": 5.0}
+
+
+def test_missing_blob_raises(bucket, tmp_path):
+    root, _ = bucket
+    with pytest.raises(FileNotFoundError):
+        _cache(root, tmp_path).get("bucket", "no_existe.csv")
@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils.benchmarking import synthetic_catalog
+from utils.gcs_cache import BlobCache, LocalStorageClient
+from utils.partitioned_sales import SALES_PREFIX, PartitionedHistory, _synthetic_month
+
+PRODUCTS = 50
+ROWS_PER_MONTH = 500
+
+
+@pytest.fixture
+def catalog():
+    return synthetic_catalog(PRODUCTS)
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    directory = tmp_path / "bucket" / SALES_PREFIX
+    directory.mkdir(parents=True)
+    return tmp_path, directory
+
+
+def _write_month(directory, month, seed=0):
+    month = pd.Period(month, freq="M")
+    _synthetic_month(month, ROWS_PER_MONTH, products=PRODUCTS, seed=seed).to_csv(
+        os.path.join(directory, f"{month}.csv"), index=False)
+
+
+def _history(root, cache_name):
+    return PartitionedHistory(BlobCache(LocalStorageClient(str(root)), cache_dir=str(root / cache_name)), "bucket")
+
+
+def _assert_same(incremental, full):
+    key = ["Date", "ProductID"]
+    got = incremental.frame.astype({c: str for c in key}).sort_values(key, kind="stable").reset_index(drop=True)
+    expected = full.frame.astype({c: str for c in key}).sort_values(key, kind="stable").reset_index(drop=True)
+    assert len(got) == len(expected)
+    assert got["Date"].tolist() == expected["Date"].tolist()
+    assert got["ProductID"].tolist() == expected["ProductID"].tolist()
+
+    dimensions = ["Year", "Quarter", "Category", "ProductID"]
+    cells = incremental.cube.cells.astype({c: str for c in dimensions}).sort_values(dimensions).reset_index(drop=True)
+    full_cells = full.cube.cells.astype({c: str for c in dimensions}).sort_values(dimensions).reset_index(drop=True)
+    pd.testing.assert_frame_equal(cells, full_cells, check_dtype=False, check_exact=False)
+
+
+def test_new_partition_is_appended_incrementally(bucket, catalog):
+    root, directory = bucket
+    for month in ["2024-01", "2024-02", "2024-03"]:
+        _write_month(directory, month)
+    history = _history(root, "cache")
+    assert history.refresh(catalog, "catalogo")
+    assert history.last_refresh["nuevas"] == 3
+
+    _write_month(directory, "2024-04")
+    assert history.refresh(catalog, "catalogo", force=True)
+    assert history.last_refresh["nuevas"] == 1
+    assert history.last_refresh["filas"] <= ROWS_PER_MONTH
+
+    full = _history(root, "cache_full")
+    full.refresh(catalog, "catalogo")
+    _assert_same(history, full)
+
+
+def test_unchanged_listing_does_not_refresh(bucket, catalog):
+    root, directory = bucket
+    _write_month(directory, "2024-01")
+    history = _history(root, "cache")
+    history.refresh(catalog, "catalogo")
+    version = history.version
+    assert not history.refresh(catalog, "catalogo", force=True)
+    assert history.version == version
+
+
+def test_rewritten_partition_rebuilds_everything(bucket, catalog):
+    root, directory = bucket
+    for month in ["2024-01", "2024-02"]:
+        _write_month(directory, month)
+    history = _history(root, "cache")
+    history.refresh(catalog, "catalogo")
+
+    path = os.path.join(directory, "2024-01.csv")
+    _write_month(directory, "2024-01", seed=1)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert history.refresh(catalog, "catalogo", force=True)
+    assert history.last_refresh["nuevas"] == 2
+
+    full = _history(root, "cache_full")
+    full.refresh(catalog, "catalogo")
+    _assert_same(history, full)
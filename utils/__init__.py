@@ -2,7 +2,14 @@ import streamlit as st
 
 # 1. Función personalizada para convertir columnas a minúsculas
 def to_lowercase(dataframe):
-    return dataframe.apply(lambda x: x.str.lower() if x.dtype == "object" else x)
+    # Solo las columnas de texto, con `.str.lower()` vectorizado por columna
+    text_columns = dataframe.select_dtypes(include=["object", "string"]).columns
+    if len(text_columns) == 0:
+        return dataframe
+    dataframe = dataframe.copy()
+    for column in text_columns:
+        dataframe[column] = dataframe[column].str.lower()
+    return dataframe
 
 def mostrar_sidebar_con_logo():
     st.sidebar.image('image/quai_analytics_logo.png')
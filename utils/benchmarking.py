@@ -0,0 +1,89 @@
+"""
+Piezas comunes a los benchmarks y mediciones de `utils` (`python -m utils.<módulo> ...`).
+
+Datos sintéticos con la forma de los archivos del dashboard (catálogo de
+productos e historial de ventas), la medición "mejor de N", la memoria
+residente del proceso y la tabla que imprime cada `main`. Cada módulo conserva
+solo lo propio de su comparación.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+CATEGORIES = np.array(["Analgésicos", "Vitaminas", "Antibióticos", "Dermatología"])
+SALES_START = pd.Timestamp("2021-01-01")
+SALES_DAYS = 4 * 365
+
+
+def best_of(fn, repeats):
+    """Resultado de `fn` y el menor tiempo de reloj entre `repeats` llamadas."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def rss_bytes():
+    """Memoria residente del proceso (aproximada fuera de Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def product_ids(products):
+    """`P0000`, `P0001`, ... como en `vitalmedic_data_enriched.csv`."""
+    return np.char.add("P", np.char.zfill(np.arange(products).astype(str), 4))
+
+
+def synthetic_catalog(products=200, seed=0):
+    """Catálogo (`ProductID`, `Brand`, `Cost`, `Price`, `StockLevel`) con una fila por producto."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "ProductID": product_ids(products),
+        "Brand": np.char.add("Marca ", (np.arange(products) % 20).astype(str)),
+        "Cost": rng.uniform(1, 50, products).round(2),
+        "Price": rng.uniform(60, 200, products).round(2),
+        "StockLevel": rng.integers(0, 1000, products),
+    })
+
+
+def synthetic_sales(rows, products=200, seed=0, start=SALES_START, days=SALES_DAYS, first_id=0):
+    """
+    Ventas (`SaleID`, `ProductID`, `ProductName`, `Category`, `Date`, `Quantity`)
+    de productos al azar entre los primeros `products`, con fechas en `days` días
+    desde `start`. El nombre y la categoría dependen solo del producto.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, products, rows)
+    return pd.DataFrame({
+        "SaleID": np.arange(rows) + first_id,
+        "ProductID": product_ids(products)[picks],
+        "ProductName": pd.Categorical.from_codes(picks, [f"Producto {i}" for i in range(products)]),
+        "Category": CATEGORIES[picks % len(CATEGORIES)],
+        "Date": (start + pd.to_timedelta(rng.integers(0, days, rows), unit="D")).strftime("%Y-%m-%d"),
+        "Quantity": rng.integers(1, 20, rows),
+    })
+
+
+def print_table(results, columns):
+    """
+    Imprime los resultados de un benchmark alineados a la derecha. `columns` es
+    una lista de (encabezado, clave, formato, escala); los `None` se muestran como "—".
+    """
+    widths = [max(len(header) + 2, 10) for header, *_ in columns]
+    print("".join(f"{header:>{width}}" for (header, *_), width in zip(columns, widths)))
+    for r in results:
+        cells = []
+        for (_, key, spec, scale), width in zip(columns, widths):
+            value = r[key]
+            cells.append(f"{'—' if value is None else format(value * scale, spec):>{width}}")
+        print("".join(cells))
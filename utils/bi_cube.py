@@ -0,0 +1,169 @@
+"""
+Cubo pre-agregado para los filtros del cuadro de control de BI.
+
+Las ventas se agregan una sola vez por versión de los datos sobre
+Año × Trimestre × Categoría × Producto (suma de revenue, conteo de filas, suma
+y conteo de márgenes, máximo de ganancia unitaria). Cada cambio de filtro solo
+recorta el cubo del año elegido, cuyo tamaño depende del catálogo y no del
+largo del historial, así que la latencia de interacción no crece con las ventas.
+
+Uso:
+    python -m utils.bi_cube --rows 20000 200000 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.benchmarking import print_table, synthetic_catalog, synthetic_sales
+
+DIMENSIONS = ["Year", "Quarter", "Category", "ProductID", "ProductName"]
+MEASURES = {"revenue": "sum", "rows": "sum", "margin_sum": "sum", "margin_count": "sum", "max_profit": "max"}
+
+
+class SalesCube:
+    def __init__(self, cells):
+        self.cells = cells
+        # Un corte por año: el selectbox solo elige entre ellos
+        self._by_year = {year: part.reset_index(drop=True) for year, part in cells.groupby("Year", sort=True)}
+
+    @classmethod
+    def build(cls, df):
+        """`df` necesita Year, Quarter, Category, ProductID, ProductName, Price, Cost y RevenuePotential."""
+        margin = (df["Price"] - df["Cost"]) / df["Price"] * 100
+        cells = (
+            df[DIMENSIONS]
+            .assign(
+                revenue=df["RevenuePotential"],
+                rows=df["ProductID"].notna().astype("int64"),
+                margin_sum=margin,
+                margin_count=margin.notna().astype("int64"),
+                max_profit=df["Price"] - df["Cost"],
+            )
+            .groupby(DIMENSIONS, observed=True, sort=True)
+            .agg(MEASURES)
+            .reset_index()
+        )
+        return cls(cells)
+
+    def merge(self, other):
+        """Cubo combinado con otro (p. ej. el de las particiones nuevas); las medidas se re-agregan."""
+        cells = pd.concat([self.cells, other.cells], ignore_index=True)
+        for dimension in ("Quarter", "Category", "ProductName"):
+            cells[dimension] = cells[dimension].astype("category")
+        return SalesCube(cells.groupby(DIMENSIONS, observed=True, sort=True).agg(MEASURES).reset_index())
+
+    @property
+    def years(self):
+        return list(self._by_year)
+
+    @property
+    def categories(self):
+        return self.cells["Category"].unique()
+
+    def slice(self, year, categories=None):
+        cells = self._by_year.get(year, self.cells.iloc[:0])
+        if categories is not None:
+            cells = cells[cells["Category"].isin(categories)]
+        return CubeSlice(cells)
+
+
+class CubeSlice:
+    def __init__(self, cells):
+        self.cells = cells
+
+    def revenue_by(self, dimension):
+        return self.cells.groupby(dimension, observed=True)["revenue"].sum().rename("RevenuePotential").reset_index()
+
+    def count_by(self, dimension, name="Cantidad"):
+        return self.cells.groupby(dimension, observed=True)["rows"].sum().rename(name).reset_index()
+
+    def top(self, dimension, n=10):
+        revenue = self.cells.groupby(dimension, observed=True)["revenue"].sum()
+        return revenue.sort_values(ascending=False).head(n).rename("RevenuePotential").reset_index()
+
+    def product_count(self):
+        return self.cells.loc[self.cells["rows"] > 0, "ProductID"].nunique()
+
+    def margin_mean(self):
+        count = self.cells["margin_count"].sum()
+        return self.cells["margin_sum"].sum() / count if count else np.nan
+
+    def most_profitable(self):
+        """ProductID con la mayor ganancia unitaria (Price - Cost), o None si el corte está vacío."""
+        if self.cells.empty:
+            return None
+        return self.cells.loc[self.cells["max_profit"].idxmax(), "ProductID"]
+
+
+def _with_masks(df, year, categories):
+    """La ruta anterior: máscaras booleanas y cuatro groupby sobre las filas."""
+    filtered = df[(df["Year"] == year) & (df["Category"].isin(categories))].copy()
+    filtered["Margin"] = (filtered["Price"] - filtered["Cost"]) / filtered["Price"] * 100
+    return (
+        filtered["ProductID"].unique().shape[0],
+        filtered["Margin"].mean(),
+        filtered.loc[(filtered["Price"] - filtered["Cost"]).idxmax(), "ProductID"],
+        filtered.groupby("Quarter", observed=True)["RevenuePotential"].sum(),
+        filtered.groupby("Category", observed=True)["ProductID"].count(),
+        filtered.groupby("Category", observed=True)["RevenuePotential"].sum(),
+        filtered.groupby("ProductName", observed=True)["RevenuePotential"].sum().sort_values(ascending=False).head(10),
+    )
+
+
+def _with_cube(cube, year, categories):
+    part = cube.slice(year, categories)
+    return (
+        part.product_count(),
+        part.margin_mean(),
+        part.most_profitable(),
+        part.revenue_by("Quarter"),
+        part.count_by("Category"),
+        part.revenue_by("Category"),
+        part.top("ProductName"),
+    )
+
+
+def benchmark(rows, repeats=20):
+    from utils.sales_prep import prepare_sales
+
+    results = []
+    for n in rows:
+        # El frame preparado de la página, sobre ventas y catálogo sintéticos
+        df = prepare_sales(synthetic_sales(n), synthetic_catalog(), how="inner")
+        year, categories = 2022, list(df["Category"].cat.categories[:3])
+
+        start = time.perf_counter()
+        cube = SalesCube.build(df)
+        build_seconds = time.perf_counter() - start
+
+        expected, got = _with_masks(df, year, categories), _with_cube(cube, year, categories)
+        assert expected[0] == got[0] and expected[2] == got[2] and np.isclose(expected[1], got[1])
+
+        timings = {}
+        for name, fn, data in (("mascaras", _with_masks, df), ("cubo", _with_cube, cube)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                fn(data, year, categories)
+            timings[name] = (time.perf_counter() - start) / repeats
+        results.append({"filas": n, "celdas": len(cube.cells), "construccion_s": build_seconds, **timings})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cubo pre-agregado de ventas.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 200_000, 2_000_000])
+    args = parser.parse_args()
+
+    print_table(benchmark(args.rows), [
+        ("filas", "filas", ",", 1),
+        ("celdas", "celdas", ",", 1),
+        ("construir (s)", "construccion_s", ".3f", 1),
+        ("máscaras (ms)", "mascaras", ".1f", 1e3),
+        ("cubo (ms)", "cubo", ".1f", 1e3),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+# Columnas que espera el pipeline de precios (model_config_v2 / pipeline v2)
+FEATURE_COLUMNS = [
+    "has_photos", "location", "building", "bathrooms",
+    "has_pool", "bedrooms", "size_m2", "parking_spaces",
+]
+
+# Columnas que el pipeline escala como números
+NUMERIC_COLUMNS = ["size_m2", "bedrooms", "bathrooms", "parking_spaces"]
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+@dataclass
+class ScoringReport:
+    """Resumen de una corrida de valoración masiva."""
+    rows: int = 0
+    seconds: float = 0.0
+    unknown_locations: set = field(default_factory=set)
+    unknown_buildings: set = field(default_factory=set)
+    corrections: dict = field(default_factory=dict)
+    invalid_numeric: dict = field(default_factory=dict)  # columna -> filas con un valor no numérico
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def count_rows(buffer):
+    """Cuenta las filas de datos de un CSV sin parsearlo (para la barra de progreso)."""
+    buffer.seek(0)
+    lines = sum(chunk.count(b"\n") for chunk in iter(lambda: buffer.read(1 << 20), b""))
+    buffer.seek(0)
+    return max(lines - 1, 0)
+
+
+def missing_columns(buffer):
+    """Columnas requeridas ausentes en el encabezado del CSV."""
+    buffer.seek(0)
+    header = pd.read_csv(buffer, nrows=0).columns
+    buffer.seek(0)
+    return [c for c in FEATURE_COLUMNS if c not in header]
+
+
+def score_csv(buffer, model, locations, buildings, intervals=None, margin_of_error=None,
+              chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """
+    Valora un CSV por bloques de `chunk_size` filas y escribe el resultado en un
+    archivo temporal, de modo que nunca se arma un DataFrame con todo el portafolio.
+
+    `locations` y `buildings` son índices de `utils.normalization`: los nombres
+    se llevan a su forma canónica (incluidas correcciones aproximadas) y las
+    filas que siguen fuera del vocabulario se marcan en la columna
+    `vocabulario_conocido`. Los valores no numéricos en `NUMERIC_COLUMNS` se
+    valoran como faltantes (el modelo los admite) y la fila se marca en
+    `valores_numericos_validos`. Si se pasa una tabla de `utils.intervals`
+    se agregan los límites inferior y superior de cada fila; sin tabla, los
+    límites usan el margen fijo `margin_of_error` (si se pasa), igual que la
+    predicción individual. Devuelve el archivo
+    (posicionado al inicio) y un `ScoringReport`.
+    """
+    report = ScoringReport()
+    # Sin buffer: `st.download_button` acepta objetos io.RawIOBase
+    output = tempfile.TemporaryFile(buffering=0)
+
+    buffer.seek(0)
+    start = time.perf_counter()
+    for i, chunk in enumerate(pd.read_csv(buffer, chunksize=chunk_size)):
+        known = {}
+        for column, index, unknown in (("location", locations, report.unknown_locations),
+                                       ("building", buildings, report.unknown_buildings)):
+            normalized, corrections = index.normalize(chunk[column])
+            known[column] = normalized.notna()
+            unknown.update(chunk.loc[~known[column], column].dropna().unique())
+            report.corrections.update(corrections)
+            chunk[column] = normalized.where(known[column], chunk[column])
+
+        numeric_ok = pd.Series(True, index=chunk.index)
+        for column in NUMERIC_COLUMNS:
+            values = pd.to_numeric(chunk[column], errors="coerce")
+            invalid = values.isna() & chunk[column].notna()
+            if invalid.any():
+                report.invalid_numeric[column] = report.invalid_numeric.get(column, 0) + int(invalid.sum())
+                numeric_ok &= ~invalid
+            chunk[column] = values
+
+        predictions = model.predict(chunk[FEATURE_COLUMNS])
+        chunk["predicted_price"] = predictions
+        if intervals is not None:
+            chunk["lower_bound"], chunk["upper_bound"] = intervals.bounds(
+                predictions, chunk["location"], chunk["size_m2"]
+            )
+        elif margin_of_error is not None:
+            chunk["lower_bound"] = predictions - margin_of_error
+            chunk["upper_bound"] = predictions + margin_of_error
+        chunk["vocabulario_conocido"] = known["location"] & known["building"]
+        chunk["valores_numericos_validos"] = numeric_ok
+        chunk.to_csv(output, header=(i == 0), index=False)
+
+        report.rows += len(chunk)
+        report.seconds = time.perf_counter() - start
+        if on_progress is not None:
+            on_progress(report)
+
+    output.seek(0)
+    return output, report
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Columnas que espera el pipeline de churn_model.pkl
+CHURN_FEATURES = ["Tenure", "MonthlyCharges", "Contract", "Complaints", "PaymentLate"]
+
+DEFAULT_THRESHOLD = 0.5
+
+# Valores aceptados de `PaymentLate`, ya sin mayúsculas ni espacios
+PAYMENT_LATE_VALUES = {"sí": 1, "si": 1, "1": 1, "no": 0, "0": 0}
+
+
+def churn_probability(model, customers):
+    """Probabilidad de baja (clase 1) con una sola pasada de `predict_proba`."""
+    positive = list(model.classes_).index(1)
+    return model.predict_proba(customers[CHURN_FEATURES])[:, positive]
+
+
+def churn_label(probabilities, threshold=DEFAULT_THRESHOLD):
+    # Con umbral 0.5 coincide con `predict` (en empate gana la clase 0)
+    return (np.asarray(probabilities) > threshold).astype(int)
+
+
+def known_categories(model, column):
+    """Categorías con las que se ajustó el `OneHotEncoder` de `column` en el preprocesador del pipeline."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    for _, transformer, columns in model.steps[0][1].transformers_:
+        step = transformer.steps[-1][1] if isinstance(transformer, Pipeline) else transformer
+        if isinstance(step, OneHotEncoder) and column in list(columns):
+            return list(step.categories_[list(columns).index(column)])
+    return None
+
+
+def read_customers(buffer, contracts=None):
+    """
+    Lee un archivo de clientes declarando los tipos de las columnas del modelo.
+    Con `contracts` (las categorías del modelo), `Contract` se normaliza sin
+    distinguir mayúsculas ni espacios y los valores desconocidos se reportan
+    como `ValueError` en lugar de fallar dentro del pipeline. `PaymentLate`
+    se valida igual contra `PAYMENT_LATE_VALUES` y queda como 0 / 1.
+    """
+    customers = pd.read_csv(
+        buffer,
+        dtype={"Tenure": "int32", "MonthlyCharges": "float64", "Contract": "category", "Complaints": "int32",
+               "PaymentLate": "category"},
+    )
+    missing = [c for c in CHURN_FEATURES if c not in customers.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(missing)}")
+    if contracts is not None:
+        canonical = {str(c).strip().lower(): c for c in contracts}
+        contract = _normalized(customers["Contract"], canonical, "Tipo de contrato desconocido", contracts)
+        customers["Contract"] = pd.Categorical(contract, categories=contracts)
+    late = _normalized(customers["PaymentLate"], PAYMENT_LATE_VALUES, "Valor de PaymentLate desconocido",
+                       ["Sí", "No", "1", "0"])
+    customers["PaymentLate"] = late.astype(int)
+    return customers
+
+
+def _normalized(column, canonical, problem, accepted):
+    """
+    Mapea la columna categórica con `canonical` sin distinguir mayúsculas ni
+    espacios; si queda algún valor sin mapear levanta `ValueError` con las líneas.
+    """
+    # Se normaliza una vez por categoría del archivo, no por fila
+    found = column.cat.categories
+    mapped = column.map(dict(zip(found, found.astype(str).str.strip().str.lower().map(canonical))))
+    unknown = mapped.isna()
+    if unknown.any():
+        rows = (column.index[unknown] + 2).tolist()  # número de línea en el CSV (con encabezado)
+        values = sorted(column[unknown].astype("string").fillna("(vacío)").unique())
+        raise ValueError(
+            f"{problem} en {unknown.sum():,} fila(s) (líneas {', '.join(map(str, rows[:10]))}"
+            f"{', ...' if len(rows) > 10 else ''}): {', '.join(values[:10])}. "
+            f"Valores aceptados: {', '.join(map(str, accepted))}."
+        )
+    return mapped
+
+
+def top_at_risk(customers, probabilities, n):
+    """
+    Los `n` clientes con mayor probabilidad de baja. Usa selección parcial
+    (`argpartition`, O(N)) y solo ordena los `n` elegidos.
+    """
+    probabilities = np.asarray(probabilities)
+    n = min(n, len(probabilities))
+    if n <= 0:
+        return customers.iloc[:0].assign(ChurnProbability=[])
+    top = np.argpartition(-probabilities, n - 1)[:n]
+    top = top[np.argsort(-probabilities[top], kind="stable")]
+    return customers.iloc[top].assign(ChurnProbability=probabilities[top])
+
+
+def sensitivity_surface(model, tenures, charges, contracts, complaints, payment_late):
+    """
+    Probabilidad de baja sobre la malla contrato × cargos × antigüedad, con las
+    demás variables fijas, en una sola llamada a `predict_proba`.
+    Devuelve un arreglo de forma (len(contracts), len(charges), len(tenures)).
+    """
+    contract_grid, charges_grid, tenure_grid = np.meshgrid(contracts, charges, tenures, indexing="ij")
+    grid = pd.DataFrame({
+        "Tenure": tenure_grid.ravel(),
+        "MonthlyCharges": charges_grid.ravel(),
+        "Contract": contract_grid.ravel(),
+        "Complaints": complaints,
+        "PaymentLate": payment_late,
+    })
+    return churn_probability(model, grid).reshape(contract_grid.shape)
@@ -0,0 +1,332 @@
+"""
+Clustering de clientes a escala: método del codo y modos de ajuste.
+
+Los ajustes de KMeans para cada K corren en paralelo en un pool de procesos
+compartido por todo el servidor (cada proceso con un solo hilo de BLAS/OpenMP
+para no sobre-suscribir los núcleos). Se lanzan por tandas de tantos K como
+procesos y el barrido se detiene cuando la curva de inercia se aplana: la
+mejora relativa de pasar de K-1 a K queda por debajo de `tolerance`. La página
+cachea el resultado por la huella de la matriz escalada y el rango de K.
+
+Para millones de clientes, `fit_clusters` ajusta los centroides con
+`MiniBatchKMeans` o con KMeans sobre una muestra estratificada por cuantiles de
+R, F y M, y luego asigna a todos los clientes al centroide más cercano por
+bloques vectorizados. La inercia se calcula siempre sobre todos los clientes,
+así que los modos son comparables con KMeans completo.
+
+Uso:
+    python -m utils.clustering codo --clients 500 5000 50000
+    python -m utils.clustering modos --clients 1000000 --k 4
+"""
+import argparse
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+K_RANGE = range(1, 11)
+FLAT_TOLERANCE = 0.02  # mejora mínima, como fracción de la inercia con K = K mínimo
+RANDOM_STATE = 42
+
+FULL_LIMIT = 50_000  # hasta aquí, el modo automático usa KMeans completo
+SAMPLE_SIZE = 100_000
+BATCH_SIZE = 4096
+ASSIGN_CHUNK_ROWS = 1_000_000
+STRATA_BINS = 4  # cuantiles por columna para la muestra estratificada
+MODES = {
+    "auto": "Automático",
+    "completo": "KMeans completo",
+    "minibatch": "MiniBatchKMeans",
+    "muestra": "Muestra estratificada",
+}
+
+
+@dataclass
+class ElbowResult:
+    ks: list
+    inertias: list
+    stopped_at: int  # primer K con la curva ya plana, o None si se recorrió todo el rango
+    fits: int
+    seconds: float
+
+
+@dataclass
+class ClusterFit:
+    mode: str
+    labels: np.ndarray
+    centroids: np.ndarray
+    inertia: float
+    fit_seconds: float
+    assign_seconds: float
+    fitted_rows: int
+
+
+def matrix_digest(matrix):
+    """Huella del contenido, la forma y el tipo de la matriz (clave de caché del barrido)."""
+    matrix = np.ascontiguousarray(matrix)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{matrix.shape}{matrix.dtype}".encode())
+    digest.update(matrix.data)
+    return digest.hexdigest()
+
+
+def _fit_inertia(matrix, k, random_state):
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(1):
+        return KMeans(n_clusters=k, random_state=random_state, n_init="auto").fit(matrix).inertia_
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers):
+    """Pool de procesos del servidor; se crea la primera vez y se reutiliza entre barridos."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: no se hereda el estado (hilos, sockets) del proceso de Streamlit
+            _pool = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = max_workers
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _flat_at(ks, inertias, tolerance):
+    """Primer K cuya mejora respecto de K-1 es menor que `tolerance` × la inercia inicial."""
+    if not inertias or inertias[0] <= 0:
+        return None
+    for i in range(1, len(inertias)):
+        if (inertias[i - 1] - inertias[i]) / inertias[0] < tolerance:
+            return ks[i]
+    return None
+
+
+def elbow_sweep(matrix, k_range=K_RANGE, max_workers=None, tolerance=FLAT_TOLERANCE,
+                random_state=RANDOM_STATE):
+    """Inercia de KMeans para cada K hasta que la curva se aplana."""
+    start = time.perf_counter()
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    ks = [k for k in k_range if k <= len(matrix)]
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(ks)))
+
+    inertias, stopped_at, fits = [], None, 0
+    for wave_start in range(0, len(ks), workers):
+        wave = ks[wave_start:wave_start + workers]
+        if workers == 1:
+            inertias.extend(_fit_inertia(matrix, k, random_state) for k in wave)
+        else:
+            pool = _get_pool(workers)
+            inertias.extend(pool.map(_fit_inertia, [matrix] * len(wave), wave, [random_state] * len(wave)))
+        fits += len(wave)
+        stopped_at = _flat_at(ks, inertias, tolerance)
+        if stopped_at is not None:
+            break
+
+    # Se conserva la curva hasta el primer K plano: muestra el codo y dónde se detuvo
+    keep = ks.index(stopped_at) + 1 if stopped_at is not None else len(inertias)
+    return ElbowResult(ks[:keep], inertias[:keep], stopped_at, fits, time.perf_counter() - start)
+
+
+def assign_nearest(matrix, centroids, chunk_rows=ASSIGN_CHUNK_ROWS):
+    """Centroide más cercano de cada fila e inercia total, por bloques de `chunk_rows` filas."""
+    centroids = np.asarray(centroids, dtype=np.float64)
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(matrix), dtype=np.int32)
+    inertia = 0.0
+    for start in range(0, len(matrix), chunk_rows):
+        block = np.asarray(matrix[start:start + chunk_rows], dtype=np.float64)
+        # ||x - c||² = ||x||² - 2 x·c + ||c||²; el término ||x||² no cambia el argmin
+        distances = centroid_norms - 2.0 * (block @ centroids.T)
+        nearest = distances.argmin(axis=1)
+        labels[start:start + len(block)] = nearest
+        inertia += float(np.maximum(
+            distances[np.arange(len(block)), nearest] + (block ** 2).sum(axis=1), 0.0
+        ).sum())
+    return labels, inertia
+
+
+def random_rank_within_groups(groups, rng):
+    """
+    Orden aleatorio dentro de cada grupo (enteros) con un solo argsort. Devuelve
+    `order` (las filas agrupadas), `rank` (la posición de `order[i]` dentro de su
+    grupo) y `counts` (el tamaño de cada grupo presente, de menor a mayor).
+    """
+    groups = np.asarray(groups)
+    if len(groups) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    # Grupo + un desempate aleatorio en [0, 1): un solo argsort deja cada grupo en orden aleatorio
+    order = np.argsort(groups + rng.random(len(groups)))
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, counts)
+    return order, rank, counts
+
+
+def stratified_sample(matrix, size, bins=STRATA_BINS, random_state=RANDOM_STATE):
+    """
+    Índices de una muestra de `size` filas, proporcional por estrato. Los
+    estratos combinan los cuantiles de cada columna, así que los clientes de
+    las colas (p. ej. el monto más alto) siguen representados.
+    """
+    if size >= len(matrix):
+        return np.arange(len(matrix))
+    rng = np.random.default_rng(random_state)
+    # Los cortes de cuantiles se estiman sobre un subconjunto: basta con que separen las colas
+    probe = rng.integers(0, len(matrix), min(len(matrix), 100_000))
+    strata = np.zeros(len(matrix), dtype=np.int64)
+    for column, probe_column in zip(np.asarray(matrix).T, np.asarray(matrix)[probe].T):
+        edges = np.quantile(probe_column, np.linspace(0, 1, bins + 1)[1:-1])
+        strata = strata * bins + np.searchsorted(edges, column, side="right")
+    order, rank, counts = random_rank_within_groups(strata, rng)
+    quota = np.ceil(counts * size / len(matrix)).astype(np.int64)
+    return np.sort(order[rank < np.repeat(quota, counts)])
+
+
+def resolve_mode(mode, rows):
+    if mode == "auto":
+        return "completo" if rows <= FULL_LIMIT else "minibatch"
+    return mode
+
+
+def fit_clusters(matrix, k, mode="auto", sample_size=SAMPLE_SIZE, batch_size=BATCH_SIZE,
+                 random_state=RANDOM_STATE, chunk_rows=ASSIGN_CHUNK_ROWS):
+    """Centroides según `mode` y asignación de todos los clientes al más cercano."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    mode = resolve_mode(mode, len(matrix))
+    start = time.perf_counter()
+    if mode == "completo":
+        model = KMeans(n_clusters=k, random_state=random_state, n_init="auto").fit(matrix)
+        fitted_rows = len(matrix)
+    elif mode == "minibatch":
+        model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=random_state,
+                                n_init="auto").fit(matrix)
+        fitted_rows = len(matrix)
+    elif mode == "muestra":
+        sample = stratified_sample(matrix, sample_size, random_state=random_state)
+        model = KMeans(n_clusters=k, random_state=random_state, n_init="auto").fit(matrix[sample])
+        fitted_rows = len(sample)
+    else:
+        raise ValueError(f"Modo de clustering desconocido: {mode!r}")
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if mode == "completo":
+        labels, inertia = model.labels_.astype(np.int32), float(model.inertia_)
+    else:
+        labels, inertia = assign_nearest(matrix, model.cluster_centers_, chunk_rows)
+    return ClusterFit(mode, labels, model.cluster_centers_, inertia, fit_seconds,
+                      time.perf_counter() - start, fitted_rows)
+
+
+def compare_modes(matrix, k, modes=("completo", "minibatch", "muestra"), **kwargs):
+    """Tiempo de ajuste e inercia de cada modo, con la inercia relativa a KMeans completo."""
+    fits = {mode: fit_clusters(matrix, k, mode, **kwargs) for mode in modes}
+    reference = fits["completo"].inertia if "completo" in fits else None
+    return pd.DataFrame([{
+        "Modo": MODES[mode],
+        "Filas ajustadas": fit.fitted_rows,
+        "Ajuste (s)": fit.fit_seconds,
+        "Asignación (s)": fit.assign_seconds,
+        "Inercia": fit.inertia,
+        "Inercia vs completo": fit.inertia / reference if reference else np.nan,
+    } for mode, fit in fits.items()])
+
+
+def _sweep_loop(matrix, k_range=K_RANGE):
+    """El barrido anterior de la página: los diez K uno tras otro."""
+    inertias = []
+    for k in k_range:
+        inertias.append(KMeans(n_clusters=k, random_state=RANDOM_STATE, n_init="auto").fit(matrix).inertia_)
+    return inertias
+
+
+def benchmark_matrix(n_clients, transactions_per_client=10, seed=0):
+    """RFM escalado de clientes simulados, para comparar modos y barridos."""
+    from sklearn.preprocessing import StandardScaler
+
+    from utils.customer_simulation import simulate_transactions
+    from utils.rfm import RFM_COLUMNS, compute_rfm
+
+    rfm = compute_rfm(simulate_transactions(n_clients, n_clients * transactions_per_client, seed=seed))
+    return StandardScaler().fit_transform(rfm[RFM_COLUMNS])
+
+
+def benchmark(clients, max_workers=None, tolerance=FLAT_TOLERANCE):
+    """Barrido secuencial completo vs paralelo con corte temprano vs respuesta desde la caché."""
+    cache = {}
+
+    def cached(matrix):
+        key = (matrix_digest(matrix), tuple(K_RANGE))
+        if key not in cache:
+            cache[key] = elbow_sweep(matrix, K_RANGE, max_workers, tolerance)
+        return cache[key]
+
+    results = []
+    for n in clients:
+        matrix = benchmark_matrix(n)
+        start = time.perf_counter()
+        expected = _sweep_loop(matrix)
+        loop_seconds = time.perf_counter() - start
+
+        elbow_sweep(matrix[:50], K_RANGE, max_workers, tolerance)  # arranque del pool fuera de la medición
+        sweep = cached(matrix)
+        assert np.allclose(sweep.inertias, expected[:len(sweep.inertias)])
+
+        start = time.perf_counter()
+        cached(matrix)
+        cached_seconds = time.perf_counter() - start
+        results.append({"clientes": n, "secuencial_s": loop_seconds, "paralelo_s": sweep.seconds,
+                        "ajustes": sweep.fits, "corte_k": sweep.stopped_at, "cache_s": cached_seconds})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clustering de clientes: barrido del codo y modos de ajuste.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    elbow = sub.add_parser("codo", help="Barrido secuencial vs paralelo con corte temprano y caché")
+    elbow.add_argument("--clients", type=int, nargs="+", default=[500, 5_000, 50_000])
+    elbow.add_argument("--workers", type=int, default=None)
+    elbow.add_argument("--tolerance", type=float, default=FLAT_TOLERANCE)
+    modes = sub.add_parser("modos", help="KMeans completo vs MiniBatchKMeans vs muestra estratificada")
+    modes.add_argument("--clients", type=int, nargs="+", default=[100_000, 1_000_000])
+    modes.add_argument("--k", type=int, default=4)
+    modes.add_argument("--sample-size", type=int, default=SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "modos":
+        with pd.option_context("display.width", 160, "display.float_format", "{:,.3f}".format):
+            for n in args.clients:
+                print(f"\n{n:,} clientes, K = {args.k}")
+                print(compare_modes(benchmark_matrix(n), args.k, sample_size=args.sample_size).to_string(index=False))
+        return
+
+    print(f"Procesos: {args.workers or os.cpu_count()}")
+    print(f"{'clientes':>10}{'secuencial (s)':>16}{'paralelo (s)':>14}{'ajustes':>9}{'corte en K':>12}{'caché (ms)':>12}")
+    for r in benchmark(args.clients, args.workers, args.tolerance):
+        cut = r["corte_k"] if r["corte_k"] is not None else "—"
+        print(f"{r['clientes']:>10,}{r['secuencial_s']:>16.3f}{r['paralelo_s']:>14.3f}"
+              f"{r['ajustes']:>9}{cut:>12}{r['cache_s'] * 1e3:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
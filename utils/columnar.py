@@ -0,0 +1,265 @@
+"""
+Materialización columnar (Parquet) de los CSV del dashboard.
+
+La primera vez que se obtiene una generación de un objeto, el CSV se lee del
+bucket como flujo de bytes y se convierte por bloques a Parquet con tipos
+explícitos (las columnas sin tipo declarado quedan como texto): nunca se tiene
+el archivo completo en memoria como bytes, texto o `StringIO`. Las cargas siguientes leen solo las columnas que se piden. El
+Parquet vive en la caché de disco con la generación del objeto, así que se
+regenera cuando cambia. Con `memoize=True` el frame leído queda además en
+memoria por generación: un rerun sin cambios en el bucket no vuelve a leer
+el Parquet.
+
+Uso:
+    python -m utils.columnar benchmark --rows 100000 1000000 3000000
+    python -m utils.columnar memory --rows 5000000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utils.benchmarking import CATEGORIES, print_table, synthetic_catalog
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# Tipos declarados de las columnas conocidas; las demás se leen como texto
+DASHBOARD_TYPES = {
+    "SaleID": pa.int64(),
+    "ProductID": pa.string(),
+    "ProductName": _CATEGORY,
+    "Category": _CATEGORY,
+    "Brand": _CATEGORY,
+    "Cost": pa.float64(),
+    "Price": pa.float64(),
+    "StockLevel": pa.int32(),
+    "Quantity": pa.int64(),
+}
+
+PARQUET_SUFFIX = ".parquet"
+BLOCK_SIZE = 1 << 20  # bytes de CSV por bloque (y por grupo de filas del Parquet)
+ARROW_POOL_ENV = "ARROW_DEFAULT_MEMORY_POOL"
+
+# El pool por defecto de Arrow (mimalloc) retiene las páginas que libera cada
+# bloque y sube el pico de la ingesta; el del sistema las devuelve. Esto cubre
+# la lectura del CSV y la conversión a pandas; la decodificación del Parquet usa
+# el pool interno de Arrow, que solo se elige al arrancar el proceso con
+# ARROW_DEFAULT_MEMORY_POOL=system (y entonces se respeta esa elección).
+if ARROW_POOL_ENV not in os.environ:
+    pa.set_memory_pool(pa.system_memory_pool())
+
+
+def stream_csv_to_parquet(blob, path, column_types=DASHBOARD_TYPES, block_size=BLOCK_SIZE, **transport):
+    """
+    Convierte el CSV del objeto a Parquet bloque a bloque, leyendo del flujo del
+    bucket. Se declaran los tipos de todas las columnas del encabezado: la
+    inferencia de Arrow solo mira el primer bloque y un bloque posterior que no
+    encaje (p. ej. texto en una columna que parecía numérica) cortaría la ingesta.
+    """
+    with blob.open("rb", **transport) as stream:
+        header = next(csv.reader([stream.readline().decode("utf-8-sig")]), [])
+        reader = pa_csv.open_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(block_size=block_size, use_threads=False, column_names=header),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: column_types.get(name, pa.string()) for name in header},
+            ),
+        )
+        with pq.ParquetWriter(path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    # Si el pool elegido retiene los bloques liberados, se devuelven antes de leer el Parquet
+    pa.default_memory_pool().release_unused()
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _parquet_frame(path, columns):
+    """Frame de un Parquet de la caché; la ruta incluye la generación, así que cada versión es otra entrada."""
+    return pd.read_parquet(path, columns=list(columns) if columns is not None else None)
+
+
+def read_columns(blob_cache, bucket_name, blob_name, columns=None, column_types=DASHBOARD_TYPES, memoize=False,
+                 generation=None):
+    """
+    Lee del bucket (vía caché) solo las columnas indicadas, ya tipadas. Con
+    `memoize`, mientras la generación no cambie el frame sale de memoria.
+    `generation` se pasa a `BlobCache.get` cuando ya se conoce la vigente.
+    """
+    cached_blob = blob_cache.get(
+        bucket_name, blob_name,
+        writer=lambda blob, path, **transport: stream_csv_to_parquet(blob, path, column_types, **transport),
+        suffix=PARQUET_SUFFIX, generation=generation,
+    )
+    if memoize:
+        # Copia superficial: los `attrs` son propios y los datos se comparten (copy-on-write)
+        frame = _parquet_frame(cached_blob.path, tuple(columns) if columns is not None else None).copy(deep=False)
+    else:
+        frame = pd.read_parquet(cached_blob.path, columns=columns)
+    # Identifica la generación de origen, p. ej. para cachear lo que se derive del frame
+    frame.attrs["version"] = cached_blob.version
+    return frame
+
+
+def _synthetic_products(n, seed=0):
+    """Catálogo ancho de `n` productos, con las columnas de texto que el dashboard no lee."""
+    rng = np.random.default_rng(seed)
+    return synthetic_catalog(n, seed).assign(
+        ProductName=rng.choice([f"Producto {i}" for i in range(2000)], n),
+        Category=rng.choice(CATEGORIES, n),
+        Supplier=rng.choice([f"Proveedor {i}" for i in range(200)], n),
+        Description=rng.choice(["Tabletas 500 mg", "Jarabe 120 ml", "Crema tópica 30 g"], n),
+    )
+
+
+def benchmark(rows, columns=("ProductID", "Brand", "Cost", "Price", "StockLevel")):
+    """Tiempo de parseo y memoria del DataFrame: CSV completo vs Parquet proyectado."""
+    from utils.gcs_cache import LocalStorageClient
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "bucket"))
+        for n in rows:
+            csv_path = os.path.join(tmp, "bucket", "products.csv")
+            _synthetic_products(n).to_csv(csv_path, index=False)
+            parquet_path = csv_path + PARQUET_SUFFIX
+            stream_csv_to_parquet(LocalStorageClient(tmp).bucket("bucket").get_blob("products.csv"), parquet_path)
+            with open(csv_path, "rb") as f:
+                raw = f.read()
+
+            start = time.perf_counter()
+            csv_frame = pd.read_csv(io.StringIO(raw.decode()))
+            csv_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            parquet_frame = pd.read_parquet(parquet_path, columns=list(columns))
+            parquet_seconds = time.perf_counter() - start
+
+            results.append({
+                "filas": n,
+                "csv_s": csv_seconds,
+                "csv_mb": csv_frame.memory_usage(deep=True).sum() / 1e6,
+                "parquet_s": parquet_seconds,
+                "parquet_mb": parquet_frame.memory_usage(deep=True).sum() / 1e6,
+            })
+    return results
+
+
+_MEMORY_PROBE = """
+import json, resource, sys
+sys.path.insert(0, {root!r})
+import io, pandas as pd
+from utils.gcs_cache import BlobCache, LocalStorageClient
+from utils.columnar import read_columns
+
+def status_bytes(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def peak_bytes():
+    # VmHWM se reinicia con exec; ru_maxrss arrastra la memoria del padre antes del fork
+    peak = status_bytes("VmHWM")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def reset_peak():
+    # Linux >= 4.0: escribir 5 en clear_refs lleva VmHWM al RSS actual
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+client = LocalStorageClient({bucket_root!r})
+cache = BlobCache(client, cache_dir={cache_dir!r})
+
+def ingest(name):
+    if {mode!r} == "texto":
+        # Ruta anterior: bytes -> str -> StringIO -> DataFrame
+        return pd.read_csv(io.StringIO(client.bucket("bucket").get_blob(name).download_as_text()))
+    return read_columns(cache, "bucket", name)
+
+# Un archivo mínimo primero: los imports diferidos de la ruta no cuentan como ingesta
+ingest("warmup.csv")
+
+# Línea base con los imports ya hechos: solo se cuenta lo que agrega la ingesta.
+# Si no se puede reiniciar el pico, la base es el pico de los imports (cota inferior).
+baseline = status_bytes("VmRSS") if reset_peak() else peak_bytes()
+
+frame = ingest("products.csv")
+print(json.dumps({{
+    "baseline_mb": baseline / 1e6,
+    "peak_mb": max(peak_bytes() - baseline, 0) / 1e6,
+    "frame_mb": frame.memory_usage(deep=True).sum() / 1e6,
+}}))
+"""
+
+
+def memory_profile(rows):
+    """
+    Memoria pico de la ingesta completa de un CSV sintético grande servido por
+    `LocalStorageClient`, cada modo en un proceso nuevo. El pico se informa por
+    encima de la línea base del proceso con los módulos ya importados.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "bucket"))
+        csv_path = os.path.join(tmp, "bucket", "products.csv")
+        _synthetic_products(rows).to_csv(csv_path, index=False)
+        _synthetic_products(10).to_csv(os.path.join(tmp, "bucket", "warmup.csv"), index=False)
+        results["csv_mb"] = os.path.getsize(csv_path) / 1e6
+        for mode in ("texto", "flujo"):
+            code = _MEMORY_PROBE.format(root=root, bucket_root=tmp, mode=mode,
+                                        cache_dir=os.path.join(tmp, "cache"))
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+            results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la ingesta columnar.")
+    parser.add_argument("command", choices=["benchmark", "memory"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        for n in args.rows:
+            r = memory_profile(n)
+            print(f"{n:,} filas, CSV de {r['csv_mb']:.0f} MB")
+            for mode in ("texto", "flujo"):
+                print(f"  {mode:>6}: pico {r[mode]['peak_mb']:8.1f} MB sobre la base de {r[mode]['baseline_mb']:.0f} MB, "
+                      f"DataFrame final {r[mode]['frame_mb']:8.1f} MB")
+        return
+
+    print_table(benchmark(args.rows), [
+        ("filas", "filas", ",", 1),
+        ("CSV (s)", "csv_s", ".3f", 1),
+        ("CSV (MB)", "csv_mb", ".1f", 1),
+        ("Parquet (s)", "parquet_s", ".3f", 1),
+        ("Parquet (MB)", "parquet_mb", ".1f", 1),
+    ])
+
+
+if __name__ == "__main__":
+    main()
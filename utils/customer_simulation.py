@@ -0,0 +1,100 @@
+"""
+Simulación vectorizada de transacciones de clientes para la página de clustering.
+
+Todas las transacciones se generan de una vez como arreglos con un
+`numpy.random.Generator` con semilla: la misma semilla y la misma fecha de
+referencia producen exactamente el mismo frame. El cliente se guarda como
+categórica (códigos enteros sobre `C001`, `C002`, ...), así que el costo y la
+memoria no dependen del largo de los identificadores y la generación escala a
+decenas de millones de filas.
+
+Uso:
+    python -m utils.customer_simulation --transactions 5000 50000 10000000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.benchmarking import best_of, print_table
+
+DAYS_BACK = 365
+MIN_AMOUNT, MAX_AMOUNT = 5.0, 500.0
+
+
+def client_ids(n_clients):
+    return [f"C{i:03}" for i in range(1, n_clients + 1)]
+
+
+def simulate_transactions(n_clients, n_transactions, seed=42, today=None):
+    """Transacciones (`ID_Cliente`, `Fecha_Compra`, `Monto_Compra`) en el último año antes de `today`."""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today if today is not None else datetime.now()).normalize()
+    base = np.datetime64(today - pd.Timedelta(days=DAYS_BACK), "s")
+
+    index_dtype = np.int16 if n_clients <= np.iinfo(np.int16).max else np.int32
+    codes = rng.integers(0, n_clients, n_transactions, dtype=index_dtype)
+    days = rng.integers(1, DAYS_BACK, n_transactions, dtype=np.int16)
+    amounts = rng.uniform(MIN_AMOUNT, MAX_AMOUNT, n_transactions)
+    np.round(amounts, 2, out=amounts)
+
+    return pd.DataFrame({
+        "ID_Cliente": pd.Categorical.from_codes(codes, categories=client_ids(n_clients)),
+        "Fecha_Compra": base + days.astype("timedelta64[D]"),
+        "Monto_Compra": amounts,
+    })
+
+
+def _simulate_loop(n_clients, n_transactions):
+    """El generador anterior de la página, fila por fila."""
+    ids = client_ids(n_clients)
+    transactions = []
+    base = datetime.now() - timedelta(days=DAYS_BACK)
+    for _ in range(n_transactions):
+        client = np.random.choice(ids)
+        days = np.random.randint(1, DAYS_BACK)
+        transactions.append([client, base + timedelta(days=days), round(np.random.uniform(MIN_AMOUNT, MAX_AMOUNT), 2)])
+    df = pd.DataFrame(transactions, columns=["ID_Cliente", "Fecha_Compra", "Monto_Compra"])
+    df["Fecha_Compra"] = pd.to_datetime(df["Fecha_Compra"])
+    return df
+
+
+def benchmark(transactions, n_clients=5000, loop_limit=100_000, repeats=3):
+    """Bucle anterior (hasta `loop_limit` filas) vs generador vectorizado."""
+    results = []
+    for n in transactions:
+        frame, vector_seconds = best_of(lambda: simulate_transactions(n_clients, n, seed=7), repeats)
+        again = simulate_transactions(n_clients, n, seed=7)
+        assert frame.equals(again), "la misma semilla debe producir el mismo frame"
+        assert frame["Monto_Compra"].between(MIN_AMOUNT, MAX_AMOUNT).all()
+
+        loop_seconds = None
+        if n <= loop_limit:
+            loop, loop_seconds = best_of(lambda: _simulate_loop(n_clients, n), 1)
+            assert list(loop.columns) == list(frame.columns) and len(loop) == len(frame)
+        results.append({
+            "transacciones": n,
+            "bucle_s": loop_seconds,
+            "vectorizado_s": vector_seconds,
+            "memoria_mb": frame.memory_usage(deep=True).sum() / 1e6,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación de transacciones: bucle vs vectorizada.")
+    parser.add_argument("--transactions", type=int, nargs="+", default=[5_000, 50_000, 10_000_000])
+    parser.add_argument("--clients", type=int, default=5000)
+    args = parser.parse_args()
+
+    print_table(benchmark(args.transactions, args.clients), [
+        ("transacciones", "transacciones", ",", 1),
+        ("bucle (s)", "bucle_s", ".3f", 1),
+        ("vectorizado (s)", "vectorizado_s", ".3f", 1),
+        ("memoria (MB)", "memoria_mb", ".1f", 1),
+    ])
+
+
+if __name__ == "__main__":
+    main()
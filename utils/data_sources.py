@@ -0,0 +1,232 @@
+"""
+Carga concurrente de las fuentes de datos del dashboard.
+
+Cada fuente declara cómo se obtiene y se parsea (`load`), su tiempo límite de
+espera y cuántos reintentos admite. Todas se lanzan a la vez en un pool de
+hilos acotado y compartido por todas las cargas (no uno por rerun), así que la
+latencia en frío la marca la fuente más lenta y no la suma de todas. Un intento
+que falla se relanza tras una espera creciente. Un intento que excede su tiempo
+límite no se duplica: el hilo no se puede interrumpir y otro intento solo
+quedaría esperando el mismo recurso, así que el reintento sigue esperando al
+intento en curso. El tiempo límite corre desde que el intento empieza a
+ejecutarse: la espera por un hilo libre del pool no cuenta. El corte real de una descarga colgada lo pone el transporte
+(p. ej. el `timeout` de `utils.gcs_cache.BlobCache`). Si una fuente agota sus
+intentos se levanta `DataSourceError` con el detalle de cada una.
+
+Uso:
+    python -m utils.data_sources --sources 4 --delay 0.5
+"""
+import argparse
+import functools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 60.0  # segundos de espera antes de contar un reintento
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5  # segundos, se duplica en cada reintento
+POLL_INTERVAL = 0.05  # segundos entre revisiones mientras haya intentos sin empezar
+
+
+@dataclass
+class DataSource:
+    name: str
+    load: Callable[[], Any]
+    timeout: float = DEFAULT_TIMEOUT
+    retries: int = DEFAULT_RETRIES
+    backoff: float = DEFAULT_BACKOFF
+
+
+@dataclass
+class SourceTiming:
+    name: str
+    seconds: float = 0.0  # duración del intento que terminó bien
+    elapsed: float = 0.0  # desde el inicio de la carga hasta que la fuente quedó lista
+    attempts: int = 0
+    ok: bool = False
+    errors: list = field(default_factory=list)
+
+
+@dataclass
+class LoadReport:
+    frames: dict
+    timings: list
+    seconds: float
+
+    @property
+    def sequential_seconds(self):
+        """Lo que habría tardado la carga una fuente tras otra."""
+        return sum(t.seconds for t in self.timings)
+
+
+class DataSourceError(RuntimeError):
+    def __init__(self, timings):
+        self.timings = timings
+        failed = [f"{t.name}: {t.errors[-1]}" for t in timings if not t.ok]
+        super().__init__("No se pudieron cargar las fuentes de datos: " + "; ".join(failed))
+
+
+@dataclass
+class _Attempt:
+    source: DataSource
+    started: float = None  # reloj monótono al empezar a ejecutarse, tras la espera
+    expired: int = 0  # tiempos límite ya contados como reintento
+
+    @property
+    def deadline(self):
+        if self.started is None:
+            return None
+        return self.started + (self.expired + 1) * self.source.timeout
+
+
+def _attempt(attempt, delay):
+    if delay:
+        time.sleep(delay)
+    attempt.started = time.monotonic()
+    start = time.perf_counter()
+    value = attempt.source.load()
+    return value, time.perf_counter() - start
+
+
+@functools.lru_cache(maxsize=None)
+def _executor(max_workers):
+    """Pool compartido por todas las cargas con el mismo tope de hilos; vive lo que el proceso."""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-source")
+
+
+def load_sources(sources, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Carga todas las fuentes en paralelo; devuelve un `LoadReport` con los DataFrames por nombre.
+
+    El pool es compartido: una fuente no debe llamar a `load_sources` desde su `load`.
+    """
+    start = time.perf_counter()
+    timings = {s.name: SourceTiming(s.name) for s in sources}
+    frames = {}
+    pending = {}  # future -> _Attempt
+    executor = _executor(max_workers)
+
+    def launch(source, delay=0.0):
+        timings[source.name].attempts += 1
+        attempt = _Attempt(source)
+        pending[executor.submit(_attempt, attempt, delay)] = attempt
+
+    def can_retry(source, error):
+        timing = timings[source.name]
+        timing.errors.append(error)
+        return len(timing.errors) <= source.retries
+
+    try:
+        for source in sources:
+            launch(source)
+        while pending:
+            deadlines = [a.deadline for a in pending.values()]
+            timeout = min((d for d in deadlines if d is not None), default=float("inf")) - time.monotonic()
+            if None in deadlines:
+                # Un intento sin empezar no tiene plazo todavía: se revisa de nuevo en breve
+                timeout = min(timeout, POLL_INTERVAL)
+            done, _ = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future).source
+                try:
+                    frames[source.name], seconds = future.result()
+                except Exception as e:
+                    if can_retry(source, f"{type(e).__name__}: {e}"):
+                        launch(source, source.backoff * 2 ** (len(timings[source.name].errors) - 1))
+                else:
+                    timing = timings[source.name]
+                    timing.ok, timing.seconds = True, seconds
+                    timing.elapsed = time.perf_counter() - start
+            now = time.monotonic()
+            for future, attempt in list(pending.items()):
+                deadline, source = attempt.deadline, attempt.source
+                if deadline is not None and deadline <= now and not future.done():
+                    if can_retry(source, f"tiempo límite de {source.timeout:g} s excedido"):
+                        # Se sigue esperando al intento en curso en vez de lanzar otro en paralelo
+                        attempt.expired += 1
+                    else:
+                        del pending[future]
+                        future.cancel()
+    finally:
+        # Lo que quede sin empezar se cancela; un intento abandonado en curso termina solo
+        for future in pending:
+            future.cancel()
+
+    ordered = [timings[s.name] for s in sources]
+    if len(frames) < len(sources):
+        raise DataSourceError(ordered)
+    return LoadReport(frames, ordered, time.perf_counter() - start)
+
+
+def mostrar_tiempos_fuentes(report):
+    with st.sidebar.expander("Carga de fuentes"):
+        st.caption(f"Total: {report.seconds:.2f} s (en serie: {report.sequential_seconds:.2f} s)")
+        for t in report.timings:
+            retries = f", {len(t.errors)} reintento(s)" if t.errors else ""
+            st.caption(f"{t.name}: {t.seconds:.2f} s{retries}")
+
+
+def benchmark(n_sources, delay, max_workers=DEFAULT_MAX_WORKERS):
+    """Fuentes simuladas con latencia fija: en serie vs en paralelo."""
+    def slow_source(i):
+        def load():
+            time.sleep(delay)
+            return pd.DataFrame({"fuente": [i]})
+        return DataSource(f"fuente_{i}", load)
+
+    sources = [slow_source(i) for i in range(n_sources)]
+    start = time.perf_counter()
+    for source in sources:
+        source.load()
+    sequential = time.perf_counter() - start
+    report = load_sources(sources, max_workers=max_workers)
+    return {"fuentes": n_sources, "serie_s": sequential, "paralelo_s": report.seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga concurrente de fuentes de datos.")
+    parser.add_argument("--sources", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.5, help="Latencia simulada por fuente (s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    r = benchmark(args.sources, args.delay, args.workers)
+    print(f"{r['fuentes']} fuentes de {args.delay:g} s: en serie {r['serie_s']:.2f} s, "
+          f"en paralelo {r['paralelo_s']:.2f} s")
+
+    # Una fuente que falla una vez y otra que excede dos veces el tiempo límite: sus
+    # reintentos esperan al mismo intento en vez de lanzar otros
+    calls = {"inestable": 0, "lenta": 0}
+    lock = threading.Lock()
+
+    def flaky():
+        with lock:
+            calls["inestable"] += 1
+            first = calls["inestable"] == 1
+        if first:
+            raise ConnectionError("fallo transitorio")
+        return pd.DataFrame()
+
+    def slow():
+        with lock:
+            calls["lenta"] += 1
+        time.sleep(1.2)
+        return pd.DataFrame()
+
+    report = load_sources([
+        DataSource("inestable", flaky, backoff=0.1),
+        DataSource("lenta", slow, timeout=0.5, backoff=0.1),
+    ])
+    for t in report.timings:
+        print(f"  {t.name}: {t.attempts} intento(s), {t.seconds:.2f} s, errores: {t.errors}")
+    assert calls["lenta"] == 1, "un intento lento no debe duplicarse"
+
+
+if __name__ == "__main__":
+    main()
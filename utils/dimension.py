@@ -0,0 +1,116 @@
+"""
+Dimensión de productos indexada por `ProductID`.
+
+El catálogo se indexa una vez por versión; los hechos (ventas) se cruzan con
+un arreglo de posiciones calculado con `get_indexer` sobre los valores únicos
+(o sobre las categorías, si la clave ya es categórica) y cada columna de la
+dimensión se trae con un `take`, sin el hash-join completo de `pd.merge`.
+Semántica de `how="right"`: las ventas con un producto desconocido se
+descartan y los productos sin ventas aparecen al final con los hechos vacíos.
+
+Uso:
+    python -m utils.dimension --rows 1000000 10000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from utils.benchmarking import best_of, print_table, synthetic_catalog, synthetic_sales
+
+
+class ProductDimension:
+    def __init__(self, products, key="ProductID"):
+        self.key = key
+        self.table = products.drop_duplicates(key).sort_values(key).reset_index(drop=True)
+        self.index = pd.Index(self.table[key])
+        # Las columnas de texto se guardan como categóricas: el take mueve solo códigos enteros
+        self._columns = {}
+        for column in self.table.columns:
+            if column == self.key:
+                continue
+            values = self.table[column]
+            if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+                values = values.astype("category")
+            self._columns[column] = values.array if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+
+    def positions(self, keys):
+        """Posición en la dimensión de cada clave (-1 si no existe)."""
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            lookup = self.index.get_indexer(keys.cat.categories)
+            codes = keys.cat.codes.to_numpy()
+        else:
+            codes, uniques = pd.factorize(keys)
+            lookup = self.index.get_indexer(uniques)
+        # El código -1 (nulo) cae en el -1 agregado al final
+        return np.append(lookup, -1)[codes]
+
+    def take(self, column, positions):
+        values = self._columns[column]
+        if isinstance(values, pd.Categorical):
+            return pd.Categorical.from_codes(values.codes.take(positions), dtype=values.dtype)
+        return values.take(positions)
+
+    def join(self, facts, how="right", positions=None):
+        if positions is None:
+            positions = self.positions(facts[self.key])
+        rows = np.flatnonzero(positions >= 0)
+        matched = positions[rows]
+        if how == "right":
+            # Productos sin ventas: una fila al final con los hechos vacíos, como en pd.merge
+            unsold = np.flatnonzero(np.bincount(matched, minlength=len(self.table)) == 0)
+            rows = np.concatenate([rows, np.full(len(unsold), -1)])
+            matched = np.concatenate([matched, unsold])
+
+        columns = {}
+        for column in facts.columns:
+            if column == self.key:
+                # La clave sale de la dimensión: categórica con el catálogo (ordenado) como categorías
+                columns[column] = pd.Categorical.from_codes(matched, categories=self.index)
+            else:
+                columns[column] = take(facts[column].array, rows, allow_fill=True)
+        for column in self._columns:
+            columns[column] = self.take(column, matched)
+        # concat por columnas: no consolida bloques ni copia los hechos otra vez
+        return pd.concat([pd.Series(values, name=name) for name, values in columns.items()], axis=1)
+
+
+def _synthetic(rows, products=200, seed=0):
+    catalog = synthetic_catalog(products, seed).iloc[5:]  # algunos productos vendidos no están en el catálogo
+    sales = synthetic_sales(rows, products - 10, seed)[["ProductID", "Quantity"]]  # y otros nunca se venden
+    return sales, catalog
+
+
+def benchmark(rows, repeats=3):
+    results = []
+    for n in rows:
+        sales, catalog = _synthetic(n)
+        merged, merge_seconds = best_of(lambda: pd.merge(sales, catalog, on="ProductID", how="right"), repeats)
+        dimension = ProductDimension(catalog)
+        positions, index_seconds = best_of(lambda: dimension.positions(sales["ProductID"]), repeats)
+        joined, take_seconds = best_of(lambda: dimension.join(sales, positions=positions), repeats)
+
+        assert len(joined) == len(merged)
+        assert np.isclose(joined["Price"].sum(), merged["Price"].sum())
+        assert joined["Quantity"].isna().sum() == merged["Quantity"].isna().sum()
+        results.append({"filas": n, "merge_s": merge_seconds, "indice_s": index_seconds, "take_s": take_seconds})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cruce indexado con la dimensión de productos vs pd.merge.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    print("Mejor de 3:")
+    print_table(benchmark(args.rows), [
+        ("filas", "filas", ",", 1),
+        ("pd.merge (s)", "merge_s", ".3f", 1),
+        ("posiciones (s)", "indice_s", ".3f", 1),
+        ("take (s)", "take_s", ".3f", 1),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Ruta rápida para el pipeline de precios (ColumnTransformer + OneHotEncoder +
+StandardScaler + estimador).
+
+`FastScorer.from_pipeline` aplana el preprocesamiento ajustado en diccionarios
+categoría -> posición y vectores de media/escala, de modo que una predicción no
+necesita construir un DataFrame ni pasar por la maquinaria de sklearn. Si el
+estimador es lineal (tiene `coef_`) los coeficientes se pliegan en tablas
+categoría -> peso y un vector de pesos numéricos, y la predicción es una suma.
+
+Uso (verifica paridad y mide latencias):
+    python -m utils.fast_scorer real_estate_model_pipeline_v2.pkl
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from utils.model_registry import registry
+
+
+def _last_step(transformer, kind):
+    if isinstance(transformer, Pipeline):
+        transformer = transformer.steps[-1][1]
+    if not isinstance(transformer, kind):
+        raise TypeError(f"Paso no soportado por la ruta rápida: {transformer!r}")
+    return transformer
+
+
+class FastScorer:
+    def __init__(self, pipeline):
+        preprocessor, estimator = pipeline.steps[0][1], pipeline.steps[-1][1]
+        if len(pipeline.steps) != 2 or not isinstance(preprocessor, ColumnTransformer):
+            raise TypeError("Se esperaba un Pipeline(ColumnTransformer, estimador)")
+
+        self.pipeline = pipeline
+        self.estimator = estimator
+        self.n_features = sum(s.stop - s.start for s in preprocessor.output_indices_.values())
+
+        # (columna, {categoría: posición}) y columnas numéricas con su posición
+        self.categorical = []
+        self.numeric, numeric_positions, means, scales = [], [], [], []
+        self.ignore_unknown = True
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            start = preprocessor.output_indices_[name].start
+            if isinstance(_last_step(transformer, (OneHotEncoder, StandardScaler)), OneHotEncoder):
+                encoder = _last_step(transformer, OneHotEncoder)
+                if encoder.drop is not None:
+                    raise TypeError("OneHotEncoder con `drop` no soportado por la ruta rápida")
+                self.ignore_unknown &= encoder.handle_unknown == "ignore"
+                for column, categories in zip(columns, encoder.categories_):
+                    self.categorical.append((column, {c: start + i for i, c in enumerate(categories)}))
+                    start += len(categories)
+            else:
+                scaler = _last_step(transformer, StandardScaler)
+                self.numeric.extend(columns)
+                numeric_positions.extend(range(start, start + len(columns)))
+                means.extend(scaler.mean_ if scaler.with_mean else np.zeros(len(columns)))
+                scales.extend(scaler.scale_ if scaler.with_std else np.ones(len(columns)))
+
+        self.numeric_positions = np.array(numeric_positions)
+        self.mean = np.array(means, dtype=float)
+        self.scale = np.array(scales, dtype=float)
+        self._category_index = {c: pd.Index(list(table)) for c, table in self.categorical}
+        self._offsets = {c: min(table.values()) for c, table in self.categorical}
+
+        self.linear = hasattr(estimator, "coef_") and np.ndim(estimator.coef_) == 1
+        if self.linear:
+            coef = np.asarray(estimator.coef_, dtype=float)
+            self.tables = [(c, {k: coef[i] for k, i in table.items()}) for c, table in self.categorical]
+            self.numeric_weights = coef[self.numeric_positions] / self.scale
+            self.bias = float(estimator.intercept_) - float(self.numeric_weights @ self.mean)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        return cls(pipeline)
+
+    def predict_one(self, row):
+        """Predicción para un solo registro (dict columna -> valor)."""
+        if self.linear:
+            total = self.bias
+            for column, table in self.tables:
+                weight = table.get(row[column])
+                if weight is None:
+                    # Los NaN pasan por el imputador del pipeline, igual que en `predict`
+                    if not self.ignore_unknown or pd.isna(row[column]):
+                        return self._fallback_one(row)
+                    continue
+                total += weight
+            for column, weight in zip(self.numeric, self.numeric_weights):
+                total += weight * row[column]
+            return total
+
+        x = np.zeros((1, self.n_features))
+        for column, table in self.categorical:
+            position = table.get(row[column])
+            if position is None:
+                if not self.ignore_unknown or pd.isna(row[column]):
+                    return self._fallback_one(row)
+                continue
+            x[0, position] = 1.0
+        x[0, self.numeric_positions] = (np.array([row[c] for c in self.numeric], dtype=float) - self.mean) / self.scale
+        return self.estimator.predict(x)[0]
+
+    def predict(self, frame):
+        """Predicción por lotes; acepta un DataFrame o un dict de columnas."""
+        n = len(frame[self.numeric[0]])
+        unknown = np.zeros(n, dtype=bool)
+        codes = []
+        for column, _ in self.categorical:
+            values = pd.Index(np.asarray(frame[column]))
+            positions = self._category_index[column].get_indexer(values)
+            # Los NaN pasan por el imputador del pipeline: mejor delegarlos
+            unknown |= pd.isna(values) | ((positions < 0) & (not self.ignore_unknown))
+            codes.append((self._offsets[column], positions))
+        numeric = (np.column_stack([np.asarray(frame[c], dtype=float) for c in self.numeric]) - self.mean) / self.scale
+
+        if self.linear:
+            predictions = np.full(n, float(self.estimator.intercept_))
+            coef = np.asarray(self.estimator.coef_, dtype=float)
+            for offset, positions in codes:
+                known = positions >= 0
+                predictions[known] += coef[offset + positions[known]]
+            predictions += numeric @ coef[self.numeric_positions]
+        else:
+            x = np.zeros((n, self.n_features))
+            rows = np.arange(n)
+            for offset, positions in codes:
+                known = positions >= 0
+                x[rows[known], offset + positions[known]] = 1.0
+            x[:, self.numeric_positions] = numeric
+            predictions = self.estimator.predict(x)
+
+        if unknown.any():
+            subset = pd.DataFrame(frame).iloc[np.flatnonzero(unknown)]
+            predictions[unknown] = self.pipeline.predict(subset)
+        return predictions
+
+    def _fallback_one(self, row):
+        return self.pipeline.predict(pd.DataFrame({k: [v] for k, v in row.items()}))[0]
+
+
+_scorers = {}
+
+
+def get_fast_scorer(path):
+    """Scorer del artefacto cargado en el registro; se reconstruye si el archivo cambia."""
+    entry = registry.entry(path)
+    key, scorer = _scorers.get(entry.path, (None, None))
+    if key != entry.key:
+        scorer = FastScorer.from_pipeline(entry.model)
+        _scorers[entry.path] = (entry.key, scorer)
+    return scorer
+
+
+def check_parity(scorer, frame, rtol=1e-9, atol=1e-6):
+    """Compara la ruta rápida con `pipeline.predict`, fila a fila y por lotes."""
+    expected = scorer.pipeline.predict(frame)
+    batch = scorer.predict(frame)
+    single = np.array([scorer.predict_one(row) for row in frame.to_dict("records")])
+    return {
+        "batch_max_abs_diff": float(np.max(np.abs(batch - expected))),
+        "single_max_abs_diff": float(np.max(np.abs(single - expected))),
+        "ok": bool(np.allclose(batch, expected, rtol=rtol, atol=atol)
+                   and np.allclose(single, expected, rtol=rtol, atol=atol)),
+    }
+
+
+def benchmark(scorer, frame, repeats=200):
+    """Latencia media (µs) por llamada: pipeline vs ruta rápida, 1 fila y lote completo."""
+    row_frame, row = frame.iloc[:1], frame.iloc[0].to_dict()
+
+    def per_call(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1e6
+
+    return {
+        "pipeline_1_fila_us": per_call(lambda: scorer.pipeline.predict(row_frame)),
+        "rapida_1_fila_us": per_call(lambda: scorer.predict_one(row)),
+        f"pipeline_{len(frame)}_filas_us": per_call(lambda: scorer.pipeline.predict(frame)),
+        f"rapida_{len(frame)}_filas_us": per_call(lambda: scorer.predict(frame)),
+    }
+
+
+def sample_frame(scorer, n, seed=0):
+    """Registros sintéticos dentro del vocabulario del modelo."""
+    rng = np.random.default_rng(seed)
+    data = {c: rng.choice(list(table), n) for c, table in scorer.categorical}
+    for column, mean, scale in zip(scorer.numeric, scorer.mean, scorer.scale):
+        data[column] = np.maximum(np.round(rng.normal(mean, scale, n)), 0)
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridad y microbenchmark de la ruta rápida.")
+    parser.add_argument("model", help="Pipeline serializado con joblib")
+    parser.add_argument("--rows", type=int, default=1000, help="Filas del lote de prueba")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    scorer = FastScorer.from_pipeline(registry.get(args.model))
+    frame = sample_frame(scorer, args.rows)
+
+    parity = check_parity(scorer, frame)
+    print(f"Paridad: {parity}")
+    if not parity["ok"]:
+        raise SystemExit("La ruta rápida no coincide con el pipeline")
+    for name, value in benchmark(scorer, frame, args.repeats).items():
+        print(f"{name:>28}: {value:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Caché local en disco para los objetos de Google Cloud Storage.
+
+Cada objeto se guarda como `<cache_dir>/<bucket>/<nombre>.<generation>`: si la
+generación no cambió, el archivo local es idéntico al del bucket y no se vuelve
+a descargar. Los metadatos solo se consultan cuando vence el TTL; mientras
+tanto la respuesta sale directamente del disco. El tiempo límite y los
+reintentos de cada llamada al bucket se delegan al cliente de almacenamiento
+(`timeout` y `retry`), así que una descarga lenta termina sola en lugar de
+quedar colgada con el candado del objeto tomado.
+
+`LocalStorageClient` imita la parte del cliente de `google.cloud.storage` que
+usamos, sobre un directorio local (un subdirectorio por bucket), para probar
+el dashboard sin credenciales.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+import streamlit as st
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "quai_blob_cache")
+DEFAULT_TTL = 300  # segundos entre revalidaciones de metadatos
+DEFAULT_TIMEOUT = 30.0  # segundos por petición al bucket
+
+
+@dataclass
+class CachedBlob:
+    bucket: str
+    name: str
+    generation: int
+    etag: str
+    size: int
+    path: str
+    checked_at: float
+
+    @property
+    def version(self):
+        return (self.bucket, self.name, self.generation)
+
+
+class BlobCache:
+    def __init__(self, client, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, timeout=DEFAULT_TIMEOUT, retry=None):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        # Argumentos de transporte de cada llamada; sin `retry` se usa la política por defecto del cliente
+        self.transport = {"timeout": timeout}
+        if retry is not None:
+            self.transport["retry"] = retry
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.revalidations = 0
+        self.bytes_downloaded = self.bytes_saved = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def local_path(self, bucket_name, blob_name, generation):
+        return os.path.join(self.cache_dir, bucket_name, f"{blob_name}.{generation}")
+
+    def get(self, bucket_name, blob_name, writer=None, suffix="", generation=None):
+        """
+        Devuelve el `CachedBlob` vigente, descargándolo solo si cambió la generación.
+
+        Si quien llama ya conoce la generación actual (p. ej. de un listado), se
+        pasa en `generation`: una entrada de otra generación se revalida aunque
+        no haya vencido el TTL.
+
+        `writer(blob, path, **transport)` permite guardar una representación derivada
+        del objeto (p. ej. Parquet, con `suffix=".parquet"`) en lugar de la copia tal
+        cual; recibe el tiempo límite y los reintentos para sus lecturas del bucket.
+        """
+        key = (bucket_name, blob_name, suffix)
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            fresh = entry is not None and now - entry.checked_at < self.ttl
+            if fresh and generation in (None, entry.generation) and os.path.exists(entry.path):
+                self._count(hits=1, bytes_saved=entry.size)
+                return entry
+
+            blob = self.client.bucket(bucket_name).get_blob(blob_name, **self.transport)
+            if blob is None:
+                raise FileNotFoundError(f"gs://{bucket_name}/{blob_name}")
+            self._count(revalidations=1)
+            entry = CachedBlob(bucket_name, blob_name, blob.generation, blob.etag, blob.size,
+                               self.local_path(bucket_name, blob_name, blob.generation) + suffix, now)
+
+            if os.path.exists(entry.path):
+                self._count(hits=1, bytes_saved=entry.size)
+            else:
+                self._download(blob, entry.path, writer or _download_raw)
+                self._count(misses=1, bytes_downloaded=entry.size)
+                self._remove_stale(entry)
+            self._entries[key] = entry
+            return entry
+
+    def _download(self, blob, path, writer):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Descarga a un temporal y renombra: nunca queda un archivo a medias
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        os.close(fd)
+        try:
+            writer(blob, tmp_path, **self.transport)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _remove_stale(self, entry):
+        """Borra las generaciones anteriores del mismo objeto y sus derivados."""
+        directory = os.path.dirname(entry.path)
+        pattern = re.compile(re.escape(os.path.basename(entry.name)) + r"\.(\d+)(\..+)?")
+        for filename in os.listdir(directory):
+            match = pattern.fullmatch(filename)
+            if match and int(match.group(1)) != entry.generation:
+                os.remove(os.path.join(directory, filename))
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "Aciertos": self.hits,
+                "Descargas": self.misses,
+                "Revalidaciones": self.revalidations,
+                "MB descargados": round(self.bytes_downloaded / 1e6, 2),
+                "MB ahorrados": round(self.bytes_saved / 1e6, 2),
+            }
+
+
+def _download_raw(blob, path, **transport):
+    blob.download_to_filename(path, **transport)
+
+
+def mostrar_cache_datos(cache):
+    with st.sidebar.expander("Caché de datos"):
+        for name, value in cache.metrics().items():
+            st.caption(f"{name}: {value}")
+
+
+class LocalBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.root, name)
+        stat = os.stat(self.path)
+        self.generation = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+    # `timeout` y `retry` se aceptan por compatibilidad con el cliente real; en disco no aplican
+    def download_to_filename(self, filename, timeout=None, retry=None):
+        shutil.copyfile(self.path, filename)
+
+    def download_as_bytes(self, timeout=None, retry=None):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def download_as_text(self, encoding="utf-8", timeout=None, retry=None):
+        return self.download_as_bytes().decode(encoding)
+
+    def open(self, mode="rb", timeout=None, retry=None):
+        return open(self.path, mode)
+
+
+class LocalBucket:
+    def __init__(self, root, name):
+        self.name = name
+        self.root = os.path.join(root, name)
+
+    def get_blob(self, blob_name, timeout=None, retry=None):
+        if not os.path.isfile(os.path.join(self.root, blob_name)):
+            return None
+        return LocalBlob(self, blob_name)
+
+    def blob(self, blob_name):
+        return LocalBlob(self, blob_name)
+
+    def list_blobs(self, prefix=""):
+        names = []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    names.append(name)
+        return [LocalBlob(self, name) for name in sorted(names)]
+
+
+class LocalStorageClient:
+    """Sustituto local de `storage.Client`: cada bucket es un subdirectorio de `root`."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def bucket(self, name):
+        return LocalBucket(self.root, name)
+
+    def list_blobs(self, bucket_or_name, prefix=""):
+        name = getattr(bucket_or_name, "name", bucket_or_name)
+        return iter(self.bucket(name).list_blobs(prefix=prefix))
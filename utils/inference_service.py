@@ -0,0 +1,249 @@
+"""
+Servicio de inferencia compartido entre sesiones con micro-lotes.
+
+Cada sesión de Streamlit corre en su propio hilo. En lugar de que cada una
+llame a `predict` con una fila, las solicitudes se encolan y un hilo de fondo
+junta las que llegan dentro de una ventana corta (`max_wait`) en una sola
+llamada por lotes; los resultados se devuelven a través de futures.
+Al detener el servicio (p. ej. porque cambió el modelo) se atienden las
+solicitudes ya encoladas y las nuevas se rechazan con `ServiceStopped`.
+
+Uso (prueba de carga con 1, 10 y 100 sesiones concurrentes):
+    python -m utils.inference_service churn_model.pkl --method predict_proba
+"""
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+DEFAULT_MAX_BATCH_SIZE = 512
+DEFAULT_MAX_WAIT = 0.005  # segundos
+DEFAULT_TIMEOUT = 10.0  # segundos de espera de una sesión antes de predecir directo
+
+
+class ServiceStopped(RuntimeError):
+    """El servicio ya fue detenido y no acepta solicitudes."""
+
+
+class BatchingService:
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._submit_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._max_queue_depth = 0
+        self._worker = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, records):
+        """Encola una lista de registros (dicts); devuelve un Future con sus predicciones."""
+        future = Future()
+        # Con el mismo lock que `stop`: toda solicitud aceptada queda antes de la marca de fin
+        with self._submit_lock:
+            if self._stopped.is_set():
+                raise ServiceStopped("El servicio de inferencia fue detenido")
+            self._queue.put((list(records), future))
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def predict(self, records, timeout=None, fallback=None):
+        """
+        Predicciones de `records`. Con `fallback`, si el servicio está detenido o
+        no responde en `timeout` segundos, se predice directo con `fallback(DataFrame)`.
+        """
+        try:
+            future = self.submit(records)
+        except ServiceStopped:
+            if fallback is None:
+                raise
+            return fallback(pd.DataFrame.from_records(records))
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # Si aún no entró en un lote, el worker la descarta
+            future.cancel()
+            if fallback is None:
+                raise
+            return fallback(pd.DataFrame.from_records(records))
+
+    def stop(self):
+        with self._submit_lock:
+            if self._stopped.is_set():
+                return
+            self._stopped.set()
+            self._queue.put(None)
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return []
+        batch, size = [item], len(item[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            # La marca de fin llega después de todo lo encolado: se atiende todo antes de salir
+            batch = self._collect()
+            if not batch:
+                break
+            # Las solicitudes que su sesión ya abandonó (timeout) no se predicen
+            batch = [(records, future) for records, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            rows = [record for records, _ in batch for record in records]
+            try:
+                predictions = self.predict_fn(pd.DataFrame.from_records(rows))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for records, future in batch:
+                future.set_result(predictions[start:start + len(records)])
+                start += len(records)
+
+            with self._metrics_lock:
+                self._batches += 1
+                self._rows += len(rows)
+                self._max_batch = max(self._max_batch, len(rows))
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                "Cola actual": self._queue.qsize(),
+                "Cola máxima": self._max_queue_depth,
+                "Lotes": self._batches,
+                "Filas": self._rows,
+                "Lote promedio": round(self._rows / self._batches, 1) if self._batches else 0.0,
+                "Lote máximo": self._max_batch,
+            }
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_service(name, predict_fn, version):
+    """
+    Servicio compartido por todo el proceso. `version` (p. ej. el hash del
+    artefacto en el registro de modelos) hace que se reemplace si el modelo cambia.
+    """
+    with _services_lock:
+        current = _services.get(name)
+        if current is not None and current[0] == version:
+            return current[1]
+        if current is not None:
+            current[1].stop()
+        service = BatchingService(predict_fn)
+        _services[name] = (version, service)
+        return service
+
+
+def mostrar_servicios():
+    with _services_lock:
+        services = {name: service.metrics() for name, (_, service) in _services.items()}
+    if services:
+        with st.sidebar.expander("Servicio de inferencia"):
+            st.dataframe(pd.DataFrame(services).T)
+
+
+def load_test(predict_fn, records, sessions, requests_per_session=50):
+    """
+    Filas por segundo con `sessions` hilos concurrentes pidiendo una fila a la
+    vez, llamando directo a `predict_fn` y a través del servicio por lotes.
+    """
+    def run(call):
+        def session(offset):
+            for i in range(requests_per_session):
+                call([records[(offset + i) % len(records)]])
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sessions * requests_per_session / (time.perf_counter() - start)
+
+    service = BatchingService(predict_fn)
+    try:
+        batched = run(service.predict)
+        metrics = service.metrics()
+    finally:
+        service.stop()
+    direct = run(lambda rows: predict_fn(pd.DataFrame.from_records(rows)))
+    return {"sesiones": sessions, "directo_filas_s": direct, "lotes_filas_s": batched,
+            "lote_promedio": metrics["Lote promedio"], "cola_maxima": metrics["Cola máxima"]}
+
+
+def sample_records(pipeline, n, seed=0):
+    """Registros sintéticos a partir de las categorías y escalas del preprocesador."""
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    data = {}
+    for name, transformer, columns in pipeline.steps[0][1].transformers_:
+        if name == "remainder":
+            continue
+        step = transformer.steps[-1][1] if isinstance(transformer, Pipeline) else transformer
+        for i, column in enumerate(columns):
+            if isinstance(step, OneHotEncoder):
+                data[column] = rng.choice(step.categories_[i], n)
+            elif isinstance(step, StandardScaler):
+                data[column] = np.maximum(np.round(rng.normal(step.mean_[i], step.scale_[i], n)), 0)
+            else:
+                data[column] = rng.integers(0, 10, n)
+    return pd.DataFrame(data).to_dict("records")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de inferencia por lotes.")
+    parser.add_argument("model", help="Pipeline serializado con joblib")
+    parser.add_argument("--method", default="predict", choices=["predict", "predict_proba"])
+    parser.add_argument("--requests", type=int, default=50, help="Solicitudes por sesión")
+    args = parser.parse_args()
+
+    from utils.model_registry import get_model
+
+    model = get_model(args.model)
+    predict_fn = getattr(model, args.method)
+    records = sample_records(model, 1000)
+
+    print(f"{'sesiones':>9}{'directo (filas/s)':>20}{'lotes (filas/s)':>18}{'lote prom.':>12}{'cola máx.':>11}")
+    for sessions in (1, 10, 100):
+        r = load_test(predict_fn, records, sessions, args.requests)
+        print(f"{r['sesiones']:>9}{r['directo_filas_s']:>20,.0f}{r['lotes_filas_s']:>18,.0f}"
+              f"{r['lote_promedio']:>12}{r['cola_maxima']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Intervalos de predicción por segmento (zona × tamaño) calibrados fuera de línea.
+
+La calibración usa conformal partido: sobre un conjunto que el modelo no vio en
+el entrenamiento se calcula el cuantil corregido de |y - ŷ| en cada segmento y
+se guarda en un JSON junto al modelo. En tiempo de consulta los límites son una
+búsqueda vectorizada en esa tabla.
+
+Uso:
+    python -m utils.intervals real_estate_model_pipeline_v2.pkl calibracion.csv --target price
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.mmap_artifacts import load_artifact
+from utils.model_registry import ModelRegistry
+
+# Límites (m²) de los grupos de tamaño; el último grupo es abierto
+SIZE_EDGES = [80, 150, 250, 400]
+
+# Mínimo de residuos para confiar en el cuantil de un segmento
+MIN_SEGMENT_SAMPLES = 20
+
+
+def intervals_path(model_path):
+    return os.path.splitext(model_path)[0] + ".intervals.json"
+
+
+def size_bucket(sizes):
+    return np.digitize(np.asarray(sizes, dtype=float), SIZE_EDGES)
+
+
+def conformal_quantile(abs_residuals, confidence):
+    """Cuantil de conformal partido con la corrección de muestra finita."""
+    n = len(abs_residuals)
+    level = min(math.ceil((n + 1) * confidence) / n, 1.0)
+    return float(np.quantile(abs_residuals, level, method="higher"))
+
+
+def calibrate(model, X_cal, y_cal, confidence=0.95, min_samples=MIN_SEGMENT_SAMPLES):
+    """
+    Calcula los márgenes por zona y grupo de tamaño. Los segmentos con pocos
+    datos heredan el margen de su zona y, si tampoco alcanza, el global.
+    """
+    residuals = np.abs(np.asarray(y_cal, dtype=float) - model.predict(X_cal))
+    frame = pd.DataFrame({
+        "location": X_cal["location"].to_numpy(),
+        "bucket": size_bucket(X_cal["size_m2"]),
+        "residual": residuals,
+    })
+
+    global_margin = conformal_quantile(residuals, confidence)
+    n_buckets = len(SIZE_EDGES) + 1
+    locations = {}
+    for location, group in frame.groupby("location"):
+        location_margin = (
+            conformal_quantile(group["residual"].to_numpy(), confidence)
+            if len(group) >= min_samples else global_margin
+        )
+        margins = [location_margin] * n_buckets
+        for bucket, segment in group.groupby("bucket"):
+            if len(segment) >= min_samples:
+                margins[bucket] = conformal_quantile(segment["residual"].to_numpy(), confidence)
+        locations[location] = margins
+
+    return {
+        "confidence": confidence,
+        "size_edges": SIZE_EDGES,
+        "global": global_margin,
+        "locations": locations,
+    }
+
+
+class IntervalTable:
+    """Tabla zona × grupo de tamaño con los márgenes calibrados."""
+
+    def __init__(self, data):
+        self.confidence = data["confidence"]
+        self.size_edges = data["size_edges"]
+        self.global_margin = data["global"]
+        self.locations = pd.Index(list(data["locations"]))
+        # La última fila es el respaldo para zonas que no estaban en la calibración
+        rows = list(data["locations"].values())
+        rows.append([self.global_margin] * (len(self.size_edges) + 1))
+        self.margins = np.array(rows, dtype=float)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def margin(self, locations, sizes):
+        codes = self.locations.get_indexer(pd.Index(locations))
+        codes[codes < 0] = len(self.locations)
+        buckets = np.digitize(np.asarray(sizes, dtype=float), self.size_edges)
+        return self.margins[codes, buckets]
+
+    def bounds(self, predictions, locations, sizes):
+        margin = self.margin(locations, sizes)
+        return predictions - margin, predictions + margin
+
+
+_tables = ModelRegistry(loader=IntervalTable.load, resolve=None)
+
+
+def load_intervals(model_path):
+    """Tabla de intervalos del modelo, o None si aún no se ha calibrado."""
+    path = intervals_path(model_path)
+    if not os.path.exists(path):
+        return None
+    return _tables.get(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra intervalos de predicción por segmento.")
+    parser.add_argument("model", help="Pipeline serializado con joblib")
+    parser.add_argument("data", help="CSV de calibración (no usado en el entrenamiento)")
+    parser.add_argument("--target", default="price", help="Columna con el precio real")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args()
+
+    # Como la app: con la compatibilidad de pickle de artefactos anteriores (v1) y el mapeo de `.mmap.joblib`
+    model = load_artifact(args.model)
+    data = pd.read_csv(args.data)
+    table = calibrate(model, data.drop(columns=[args.target]), data[args.target], args.confidence)
+
+    output = intervals_path(args.model)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=4, ensure_ascii=False)
+    print(f"{len(table['locations'])} zonas calibradas -> {output}")
+
+
+if __name__ == "__main__":
+    main()
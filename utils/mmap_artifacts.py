@@ -0,0 +1,126 @@
+"""
+Formato de artefactos mapeable en memoria.
+
+`convert` vuelve a guardar un pickle de joblib sin compresión como
+`<nombre>.mmap.joblib`; al cargarlo con `mmap_mode="r"` los arreglos numpy se
+leen directamente del archivo en modo solo lectura, y varios procesos del
+servidor comparten esas páginas a través de la caché del sistema operativo.
+
+Uso:
+    python -m utils.mmap_artifacts convert *.pkl
+    python -m utils.mmap_artifacts benchmark *.pkl
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import joblib
+
+MMAP_SUFFIX = ".mmap.joblib"
+
+
+def mmap_path(path):
+    return os.path.splitext(path)[0] + MMAP_SUFFIX
+
+
+def resolve_artifact(path):
+    """Usa la versión mapeable si existe y no es más antigua que el pickle."""
+    candidate = mmap_path(path)
+    if os.path.exists(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(path):
+        return candidate
+    return path
+
+
+def load_artifact(path):
+    from utils.normalization import install_pickle_compat
+
+    install_pickle_compat()
+    if path.endswith(MMAP_SUFFIX):
+        return joblib.load(path, mmap_mode="r")
+    return joblib.load(path)
+
+
+def convert(path):
+    output = mmap_path(path)
+    joblib.dump(load_artifact(path), output, compress=0)
+    return output
+
+
+_PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+from utils.mmap_artifacts import load_artifact
+from utils.benchmarking import rss_bytes
+from utils.normalization import install_pickle_compat
+import sklearn.ensemble, sklearn.pipeline, sklearn.compose  # fuera de la medición
+install_pickle_compat()
+
+def pss():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+rss, pss_before = rss_bytes(), pss()
+start = time.perf_counter()
+load_artifact({path!r})
+seconds = time.perf_counter() - start
+pss_after = pss()
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_delta": rss_bytes() - rss,
+    "pss_delta": None if pss_before is None else pss_after - pss_before,
+}}))
+"""
+
+
+def cold_start(path):
+    """Carga el artefacto en un proceso nuevo y mide tiempo y memoria."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = _PROBE.format(root=root, path=os.path.abspath(path))
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(paths, repeats=3):
+    rows = []
+    for path in paths:
+        candidates = [("pickle", path)]
+        if os.path.exists(mmap_path(path)):
+            candidates.append(("mmap", mmap_path(path)))
+        for mode, artifact in candidates:
+            runs = [cold_start(artifact) for _ in range(repeats)]
+            best = min(runs, key=lambda r: r["seconds"])
+            rows.append({"artefacto": os.path.basename(path), "modo": mode, **best})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artefactos mapeables en memoria.")
+    parser.add_argument("command", choices=["convert", "benchmark"])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for path in args.paths:
+            print(f"{path} -> {convert(path)}")
+        return
+
+    def mb(value):
+        return "n/d" if value is None else f"{value / 1e6:.1f}"
+
+    print(f"{'artefacto':<38}{'modo':<8}{'carga (s)':>10}{'RSS (MB)':>10}{'PSS (MB)':>10}")
+    for row in benchmark(args.paths, args.repeats):
+        print(f"{row['artefacto']:<38}{row['modo']:<8}{row['seconds']:>10.3f}"
+              f"{mb(row['rss_delta']):>10}{mb(row['pss_delta']):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import streamlit as st
+
+from utils.benchmarking import rss_bytes
+from utils.mmap_artifacts import load_artifact, resolve_artifact
+
+
+@dataclass
+class ModelEntry:
+    """Modelo cargado junto con la huella del archivo del que proviene."""
+    path: str
+    mtime: float
+    size: int
+    sha256: str
+    model: object
+    load_seconds: float
+    memory_bytes: int
+    loads: int = 1
+
+    @property
+    def key(self):
+        return (self.path, self.mtime, self.sha256)
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compartido por todo el proceso del servidor.
+
+    Cada artefacto se deserializa una sola vez, la primera vez que se pide.
+    En las siguientes llamadas solo se hace un `os.stat`; si cambian la fecha
+    de modificación o el tamaño se recalcula el hash y, si el contenido es
+    distinto, se vuelve a cargar. Si existe una versión `.mmap.joblib` del
+    artefacto (ver `utils.mmap_artifacts`) se usa esa.
+    """
+
+    def __init__(self, loader=load_artifact, resolve=resolve_artifact):
+        self._loader = loader
+        self._resolve = resolve
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        return self.entry(path).model
+
+    def entry(self, path):
+        if self._resolve is not None:
+            path = self._resolve(path)
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime == stat.st_mtime and entry.size == stat.st_size:
+                return entry
+
+            digest = _file_sha256(path)
+            if entry is not None and entry.sha256 == digest:
+                # El archivo se tocó pero el contenido es el mismo
+                entry.mtime, entry.size = stat.st_mtime, stat.st_size
+                return entry
+
+            model, seconds, memory = self._load(path)
+            loads = entry.loads + 1 if entry is not None else 1
+            entry = ModelEntry(path, stat.st_mtime, stat.st_size, digest, model, seconds, memory, loads)
+            self._entries[path] = entry
+            return entry
+
+    def version(self, path):
+        """Hash del artefacto actualmente cargado; cambia cuando se recarga."""
+        return self.entry(path).sha256
+
+    def _load(self, path):
+        before = rss_bytes()
+        start = time.perf_counter()
+        model = self._loader(path)
+        seconds = time.perf_counter() - start
+        return model, seconds, max(rss_bytes() - before, 0)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                if self._resolve is not None:
+                    path = self._resolve(path)
+                self._entries.pop(os.path.abspath(path), None)
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "Modelo": os.path.basename(e.path),
+                    "SHA256": e.sha256[:12],
+                    "Carga (s)": round(e.load_seconds, 3),
+                    "Memoria (MB)": round(e.memory_bytes / 1e6, 2),
+                    "Cargas": e.loads,
+                }
+                for e in self._entries.values()
+            ]
+
+
+# Instancia única por proceso: los módulos de Python se importan una sola vez
+registry = ModelRegistry()
+
+
+def get_model(path):
+    return registry.get(path)
+
+
+def mostrar_modelos_cargados():
+    stats = registry.stats()
+    if stats:
+        with st.sidebar.expander("Modelos cargados"):
+            st.dataframe(stats, hide_index=True)
@@ -0,0 +1,117 @@
+"""
+Normalización de las variables categóricas (zonas y edificios).
+
+El vocabulario de cada `model_config*.json` se indexa una sola vez por proceso:
+las claves se pliegan (sin mayúsculas, acentos ni espacios extra), de modo que
+duplicados como "Punta Pacifica" / "punta pacifica" apuntan al mismo nombre
+canónico. Los nombres desconocidos se resuelven con un índice de trigramas que
+reduce los candidatos antes de puntuarlos con `thefuzz`.
+"""
+import json
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from thefuzz import fuzz
+
+from utils.model_registry import ModelRegistry
+
+NGRAM = 3
+MAX_CANDIDATES = 10
+FUZZY_THRESHOLD = 85
+
+
+def fold_keys(values):
+    """Pliega un Index/Series de textos con operaciones vectorizadas de pandas."""
+    return (
+        pd.Series(values, dtype="object").astype(str)
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.casefold().str.split().str.join(" ")
+    )
+
+
+def _ngrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class VocabularyIndex:
+    def __init__(self, names):
+        self.names = []
+        self._by_key = {}
+        for name, key in zip(names, fold_keys(names)):
+            if key not in self._by_key:
+                name = sys.intern(name)
+                self._by_key[key] = name
+                self.names.append(name)
+        self._keys = list(self._by_key)
+        self._grams = defaultdict(list)
+        for i, key in enumerate(self._keys):
+            for gram in _ngrams(key):
+                self._grams[gram].append(i)
+        self._fuzzy = {}
+
+    def resolve_fuzzy(self, key, threshold=FUZZY_THRESHOLD):
+        """Nombre canónico más parecido a una clave ya plegada, o None."""
+        if key in self._fuzzy:
+            return self._fuzzy[key]
+        shared = Counter(i for gram in _ngrams(key) for i in self._grams.get(gram, ()))
+        best, best_score = None, threshold - 1
+        for i, _ in shared.most_common(MAX_CANDIDATES):
+            score = fuzz.WRatio(key, self._keys[i])
+            if score > best_score:
+                best, best_score = self._by_key[self._keys[i]], score
+        self._fuzzy[key] = best
+        return best
+
+    def normalize(self, values, fuzzy=True):
+        """
+        Lleva una columna completa a los nombres canónicos. Solo se procesan los
+        valores únicos; el resultado se reconstruye con los códigos de `factorize`.
+        Devuelve la columna normalizada (NaN si no se reconoce) y un dict con las
+        correcciones aproximadas aplicadas.
+        """
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        keys = fold_keys(uniques)
+        resolved = keys.map(self._by_key)
+        corrections = {}
+        if fuzzy:
+            for i in np.flatnonzero(resolved.isna().to_numpy()):
+                match = self.resolve_fuzzy(keys.iloc[i])
+                if match is not None:
+                    resolved.iloc[i] = match
+                    corrections[uniques[i]] = match
+        lookup = np.append(resolved.to_numpy(dtype=object), np.nan)
+        return pd.Series(lookup[codes], index=getattr(values, "index", None), dtype="object"), corrections
+
+
+@dataclass
+class Vocabulary:
+    locations: VocabularyIndex
+    buildings: VocabularyIndex
+    average_rmse: float
+
+    @classmethod
+    def from_config(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(VocabularyIndex(config["locations"]), VocabularyIndex(config["buildings"]), config["average_rmse"])
+
+
+def get_vocabulary(config_path):
+    """Vocabulario del config, indexado una sola vez por proceso (se recarga si cambia el archivo)."""
+    return _vocabularies.get(config_path)
+
+
+def install_pickle_compat():
+    """El pipeline v1 se serializó con `to_lowercase` definida en `__main__`."""
+    import __main__
+    from utils import to_lowercase
+
+    if not hasattr(__main__, "to_lowercase"):
+        __main__.to_lowercase = to_lowercase
+
+
+_vocabularies = ModelRegistry(loader=Vocabulary.from_config, resolve=None)
@@ -0,0 +1,213 @@
+"""
+Ingesta incremental del historial de ventas particionado por fecha.
+
+En lugar de un único `vitalmedic_sales_history.csv` que crece sin fin, el
+historial puede guardarse como un objeto por día o por mes bajo un prefijo
+(`vitalmedic_sales_history/2024-03.csv`, `.../2024-03-15.csv`, ...).
+`PartitionedHistory` lista las particiones, descarga solo las que no ha visto,
+las prepara contra el catálogo y las agrega al frame y al cubo en memoria: una
+actualización cuesta en proporción a los datos nuevos, no al historial
+completo. Si una partición ya vista cambia de generación o desaparece, o si
+cambia el catálogo, se reconstruye todo desde la caché de disco (sin volver a
+descargar lo que no cambió).
+
+Uso (con un directorio local en lugar del bucket):
+    python -m utils.partitioned_sales split sales.csv /tmp/bucket/data_quai_dev/vitalmedic_sales_history
+    python -m utils.partitioned_sales benchmark --months 36 --rows-per-month 100000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.benchmarking import synthetic_catalog, synthetic_sales
+from utils.bi_cube import SalesCube
+from utils.columnar import read_columns
+from utils.data_sources import DataSource, load_sources
+from utils.dimension import ProductDimension
+from utils.sales_prep import append_prepared, prepare_sales
+
+SALES_PREFIX = "vitalmedic_sales_history/"
+PARTITION_SUFFIX = ".csv"
+LIST_TTL = 300  # segundos entre listados del prefijo
+
+
+def list_partitions(client, bucket_name, prefix=SALES_PREFIX):
+    """{nombre: generación} de las particiones bajo el prefijo."""
+    return {
+        blob.name: blob.generation
+        for blob in client.list_blobs(bucket_name, prefix=prefix)
+        if blob.name.endswith(PARTITION_SUFFIX)
+    }
+
+
+class PartitionedHistory:
+    def __init__(self, blob_cache, bucket_name, prefix=SALES_PREFIX, list_ttl=LIST_TTL):
+        self.blob_cache = blob_cache
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.list_ttl = list_ttl
+        self.partitions = {}
+        self.catalog_version = None
+        self.frame = None
+        self.cube = None
+        self.dimension = None
+        self.last_refresh = {}
+        self._listed = {}
+        self._listed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return (self.catalog_version, tuple(sorted(self.partitions.items())))
+
+    def listing(self, force=False):
+        """Particiones del bucket; el prefijo se vuelve a listar solo cuando vence `list_ttl`."""
+        with self._lock:
+            return self._list(force)
+
+    def _list(self, force):
+        now = time.monotonic()
+        if force or self._listed_at is None or now - self._listed_at >= self.list_ttl:
+            self._listed = list_partitions(self.blob_cache.client, self.bucket_name, self.prefix)
+            self._listed_at = now
+        return self._listed
+
+    def refresh(self, catalog, catalog_version=None, force=False):
+        """Incorpora las particiones nuevas; devuelve True si cambiaron los datos."""
+        with self._lock:
+            listed = self._list(force)
+            same_catalog = self.frame is not None and catalog_version == self.catalog_version
+            if same_catalog and listed == self.partitions:
+                return False
+
+            start = time.perf_counter()
+            if not same_catalog:
+                self.dimension = ProductDimension(catalog)
+            rewritten = [n for n, g in self.partitions.items() if listed.get(n) != g]
+            if same_catalog and not rewritten:
+                new = sorted(n for n in listed if n not in self.partitions)
+                rows = self._prepare(new, listed)
+                self.frame = append_prepared(self.frame, rows)
+                self.cube = self.cube.merge(SalesCube.build(rows))
+            else:
+                new = sorted(listed)
+                rows = self._prepare(new, listed)
+                self.frame = rows.reset_index(drop=True)
+                self.cube = SalesCube.build(rows)
+                self.catalog_version = catalog_version
+
+            self.partitions = dict(listed)
+            self.last_refresh = {"nuevas": len(new), "filas": len(rows), "segundos": time.perf_counter() - start}
+            return True
+
+    def snapshot(self):
+        """Frame, cubo y versión consistentes entre sí, aunque otra sesión esté actualizando."""
+        with self._lock:
+            return self.frame, self.cube, self.version
+
+    def _prepare(self, names, listed):
+        """Lee las particiones en paralelo (vía la caché de disco) y las cruza con la dimensión de productos."""
+        # Con la generación del listado, una partición reescrita no sale de la caché aunque no venza su TTL
+        report = load_sources([
+            DataSource(name, lambda name=name: read_columns(self.blob_cache, self.bucket_name, name,
+                                                            generation=listed[name]))
+            for name in names
+        ])
+        sales = pd.concat([report.frames[name] for name in names], ignore_index=True) if names else None
+        if sales is None or sales.empty:
+            sales = pd.DataFrame(columns=["ProductID", "ProductName", "Category", "Date"])
+        # Las ventas sin producto en el catálogo no llegan a ningún año ni al cubo
+        return prepare_sales(sales, self.dimension, how="inner")
+
+
+def mostrar_historial(history):
+    with st.sidebar.expander("Historial de ventas"):
+        st.caption(f"Particiones: {len(history.partitions)}")
+        if history.frame is not None:
+            st.caption(f"Filas: {len(history.frame):,}")
+        if history.last_refresh:
+            r = history.last_refresh
+            st.caption(f"Última actualización: {r['nuevas']} partición(es), {r['filas']:,} filas en {r['segundos']:.2f} s")
+
+
+def split_history(csv_path, output_dir, freq="M"):
+    """Parte un CSV de ventas en un archivo por mes (`M`) o por día (`D`)."""
+    sales = pd.read_csv(csv_path)
+    dates = pd.to_datetime(sales["Date"])
+    keys = dates.dt.strftime("%Y-%m" if freq == "M" else "%Y-%m-%d")
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for key, part in sales.groupby(keys, sort=True):
+        path = os.path.join(output_dir, f"{key}{PARTITION_SUFFIX}")
+        part.to_csv(path, index=False)
+        written.append(path)
+    return written
+
+
+def _synthetic_month(month, rows, products=200, seed=0):
+    return synthetic_sales(rows, products, seed + month.ordinal, start=month.start_time,
+                           days=month.days_in_month, first_id=month.ordinal * rows)
+
+
+def benchmark(months, rows_per_month, products=200):
+    """Carga inicial de `months` particiones y luego la llegada de un mes más."""
+    from utils.gcs_cache import BlobCache, LocalStorageClient
+
+    catalog = synthetic_catalog(products)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "bucket", SALES_PREFIX)
+        os.makedirs(directory)
+        periods = pd.period_range("2020-01", periods=months + 1, freq="M")
+        for month in periods[:-1]:
+            _synthetic_month(month, rows_per_month).to_csv(os.path.join(directory, f"{month}.csv"), index=False)
+
+        history = PartitionedHistory(BlobCache(LocalStorageClient(tmp), cache_dir=os.path.join(tmp, "cache")), "bucket")
+        history.refresh(catalog, "catalogo")
+        initial = dict(history.last_refresh)
+
+        _synthetic_month(periods[-1], rows_per_month).to_csv(os.path.join(directory, f"{periods[-1]}.csv"), index=False)
+        history.refresh(catalog, "catalogo", force=True)
+        incremental = dict(history.last_refresh)
+
+        start = time.perf_counter()
+        full = PartitionedHistory(BlobCache(LocalStorageClient(tmp), cache_dir=os.path.join(tmp, "cache_full")), "bucket")
+        full.refresh(catalog, "catalogo")
+        rebuild = time.perf_counter() - start
+
+        assert len(full.frame) == len(history.frame)
+        assert np.isclose(full.cube.cells["revenue"].sum(), history.cube.cells["revenue"].sum())
+    return {"inicial": initial, "incremental": incremental, "completa_s": rebuild, "filas": len(history.frame)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de ventas particionado por fecha.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split = sub.add_parser("split", help="Parte un CSV de ventas en particiones por fecha")
+    split.add_argument("csv")
+    split.add_argument("output_dir")
+    split.add_argument("--freq", choices=["M", "D"], default="M")
+    bench = sub.add_parser("benchmark", help="Carga inicial vs actualización incremental")
+    bench.add_argument("--months", type=int, default=36)
+    bench.add_argument("--rows-per-month", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.command == "split":
+        for path in split_history(args.csv, args.output_dir, args.freq):
+            print(path)
+        return
+
+    r = benchmark(args.months, args.rows_per_month)
+    print(f"Historial final: {r['filas']:,} filas")
+    print(f"  carga inicial ({r['inicial']['nuevas']} particiones): {r['inicial']['segundos']:.2f} s")
+    print(f"  mes nuevo ({r['incremental']['filas']:,} filas):     {r['incremental']['segundos']:.2f} s")
+    print(f"  recarga completa sin caché:          {r['completa_s']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
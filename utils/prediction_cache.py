@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils.bulk_scoring import FEATURE_COLUMNS
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 3600  # segundos
+
+
+def _normalize(value):
+    # Solo se unifican representaciones que el modelo valora igual (2.0 y 2, escalares
+    # de numpy); los textos van tal cual, porque el scorer tampoco los transforma
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if hasattr(value, "item"):  # escalares de numpy
+        return _normalize(value.item())
+    return value
+
+
+def feature_key(record, columns=FEATURE_COLUMNS):
+    return tuple(_normalize(record[c]) for c in columns)
+
+
+class PredictionCache:
+    """
+    Caché LRU con expiración (TTL) para predicciones individuales.
+
+    Cada entrada queda asociada a la versión del modelo con la que se calculó;
+    al cambiar la versión se vacía la caché completa.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, columns=FEATURE_COLUMNS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.columns = columns
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get_or_compute(self, record, compute, version):
+        key = feature_key(record, self.columns)
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (value, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "Entradas": len(self._entries),
+                "Aciertos": self.hits,
+                "Fallos": self.misses,
+                "Tasa de acierto": f"{self.hits / lookups:.1%}" if lookups else "n/d",
+                "Desalojos": self.evictions,
+                "Expiradas": self.expirations,
+                "Invalidaciones": self.invalidations,
+            }
+
+
+# Una caché por proceso: compartida entre todas las sesiones
+price_cache = PredictionCache()
+
+
+def mostrar_cache(cache=price_cache):
+    with st.sidebar.expander("Caché de predicciones"):
+        for name, value in cache.metrics().items():
+            st.caption(f"{name}: {value}")
@@ -0,0 +1,235 @@
+"""
+Instrumentación de tiempos y memoria por etapa, común a todas las páginas.
+
+Cada página abre una corrida con `start_run`, la cierra con `finish_run` y
+marca sus etapas con `profile_stage`, como bloque `with` o como decorador. Si
+la página levanta una excepción antes de `finish_run`, la corrida queda abierta
+en la sesión y el siguiente `start_run` la cierra y la exporta con el error
+(el de la etapa por la que salió la excepción, o `interrumpida`). Por etapa se registra el tiempo de reloj, el
+tiempo de CPU y la variación del RSS. CPU y RSS son del proceso completo:
+incluyen los hilos de numpy / scikit-learn, pero también lo que hagan en ese
+lapso otras sesiones del mismo servidor, y así se rotulan en el panel. Con
+`QUAI_PROFILE_LOG=<ruta>` cada corrida se agrega a un archivo JSON-lines; con
+`?perfil=1` en la URL (o `QUAI_PROFILE_PANEL=1`) se muestra el panel en la
+barra lateral.
+
+Uso:
+    start_run("Mi página")
+    with profile_stage("descarga GCS"):
+        ...
+    finish_run()
+
+    @profile_stage("ajuste KMeans")
+    def ajustar(...):
+        ...
+
+    python -m utils.profiling perfil.jsonl   # p50 / p95 por página y etapa
+"""
+import argparse
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+import streamlit as st
+
+from utils.benchmarking import rss_bytes
+
+PROFILE_LOG_ENV = "QUAI_PROFILE_LOG"
+PROFILE_PANEL_ENV = "QUAI_PROFILE_PANEL"
+PANEL_QUERY_PARAM = "perfil"
+MAX_RUNS_PER_SESSION = 20
+OPEN_RUN_KEY = "_perfil_abierta"
+INTERRUPTED = "interrumpida"
+
+_current_run = contextvars.ContextVar("profile_run", default=None)
+_run_ids = itertools.count(1)
+_log_lock = threading.Lock()
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    depth: int
+    wall_s: float
+    cpu_s: float  # CPU del proceso, no solo de esta sesión
+    rss_delta_bytes: int  # RSS del proceso
+    error: str = None
+
+
+@dataclass
+class ProfileRun:
+    page: str
+    session: str
+    run: int
+    started_at: float
+    records: list = field(default_factory=list)
+    panel: object = None
+    error: str = None  # última excepción que salió de una etapa
+    _depth: int = 0
+    _start: float = field(default_factory=time.perf_counter)
+    _cpu_start: float = field(default_factory=time.process_time)
+    _last: tuple = None  # (reloj, CPU) al cerrar la última etapa
+
+    def __post_init__(self):
+        self._last = (self._start, self._cpu_start)
+
+    def to_json_lines(self):
+        base = {"ts": self.started_at, "page": self.page, "session": self.session, "run": self.run}
+        return [json.dumps({**base, **asdict(record)}, ensure_ascii=False) for record in self.records]
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def start_run(page):
+    """
+    Abre la corrida de esta página para la sesión actual; llamarla al inicio de
+    cada página. Antes cierra la corrida anterior de la sesión si quedó abierta.
+    """
+    abandoned = st.session_state.pop(OPEN_RUN_KEY, None)
+    if abandoned is not None:
+        # Se cortó antes de `finish_run`: el total llega hasta la última etapa cerrada
+        abandoned.panel = None
+        _close(abandoned, abandoned.error or INTERRUPTED, *abandoned._last)
+    run = ProfileRun(page, _session_id(), next(_run_ids), time.time())
+    _current_run.set(run)
+    st.session_state[OPEN_RUN_KEY] = run
+    return run
+
+
+class profile_stage(ContextDecorator):
+    """Registra una etapa de la corrida actual; sin corrida abierta no hace nada."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada usa su propia instancia (llamadas anidadas o en paralelo)
+        return type(self)(self.name)
+
+    def __enter__(self):
+        self._run = _current_run.get()
+        if self._run is not None:
+            self._run._depth += 1
+        self._wall, self._cpu, self._rss = time.perf_counter(), time.process_time(), rss_bytes()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        run = self._run
+        if run is not None:
+            run._depth -= 1
+            wall, cpu = time.perf_counter(), time.process_time()
+            error = None if exc_type is None else exc_type.__name__
+            run.records.append(StageRecord(
+                self.name, run._depth, wall - self._wall, cpu - self._cpu, rss_bytes() - self._rss, error,
+            ))
+            run._last = (wall, cpu)
+            # `st.stop` / `st.rerun` no heredan de Exception y no cuentan como error
+            if exc_type is not None and issubclass(exc_type, Exception):
+                run.error = error
+        return False
+
+
+def panel_enabled():
+    if os.environ.get(PROFILE_PANEL_ENV) == "1":
+        return True
+    try:
+        return st.query_params.get(PANEL_QUERY_PARAM) == "1"
+    except Exception:
+        return False
+
+
+def mostrar_perfil():
+    """Reserva el panel en la barra lateral; se llena al cerrar la corrida con `finish_run`."""
+    run = _current_run.get()
+    if run is not None and panel_enabled():
+        run.panel = st.sidebar.empty()
+
+
+def finish_run():
+    """Cierra la corrida: total de la página, exportación JSON-lines y panel."""
+    run = _current_run.get()
+    if run is None:
+        return
+    _current_run.set(None)
+    st.session_state.pop(OPEN_RUN_KEY, None)
+    _close(run, None, time.perf_counter(), time.process_time())
+
+
+def _close(run, error, wall, cpu):
+    run.records.append(StageRecord("total", 0, wall - run._start, cpu - run._cpu_start, 0, error))
+
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if path:
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(run.to_json_lines()) + "\n")
+
+    history = st.session_state.setdefault("_perfil_corridas", [])
+    history.append(run.to_json_lines())
+    del history[:-MAX_RUNS_PER_SESSION]
+
+    if run.panel is not None:
+        _render_panel(run, history)
+
+
+def _render_panel(run, history):
+    frame = pd.DataFrame([asdict(r) for r in run.records])
+    frame["Etapa"] = [" " * d + s for d, s in zip(frame["depth"], frame["stage"])]
+    frame["Reloj (ms)"] = frame["wall_s"] * 1e3
+    frame["CPU proceso (ms)"] = frame["cpu_s"] * 1e3
+    frame["Δ RSS proceso (MB)"] = frame["rss_delta_bytes"] / 1e6
+    measures = ["Reloj (ms)", "CPU proceso (ms)", "Δ RSS proceso (MB)"]
+    with run.panel.container():
+        with st.expander("Perfil de la corrida", expanded=True):
+            st.dataframe(
+                frame[["Etapa", *measures, "error"]].rename(columns={"error": "Error"}),
+                column_config={c: st.column_config.NumberColumn(format="%.1f") for c in measures},
+                hide_index=True,
+            )
+            st.caption("CPU y RSS son del proceso: incluyen a las demás sesiones activas.")
+            st.download_button(
+                "Exportar JSON-lines",
+                data="\n".join(itertools.chain.from_iterable(history)) + "\n",
+                file_name="perfil.jsonl",
+                mime="application/jsonl",
+                on_click="ignore",
+                key="perfil_exportar",
+            )
+
+
+def summarize(path):
+    """p50 / p95 del tiempo de reloj y CPU por página y etapa de un archivo JSON-lines."""
+    records = pd.read_json(path, lines=True)
+    grouped = records.groupby(["page", "stage"], sort=True)
+    return pd.DataFrame({
+        "corridas": grouped.size(),
+        "reloj_p50_ms": grouped["wall_s"].median() * 1e3,
+        "reloj_p95_ms": grouped["wall_s"].quantile(0.95) * 1e3,
+        "cpu_proceso_p50_ms": grouped["cpu_s"].median() * 1e3,
+        "rss_proceso_p95_mb": grouped["rss_delta_bytes"].quantile(0.95) / 1e6,
+        "errores": grouped["error"].count(),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen de un perfil exportado en JSON-lines.")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 160, "display.max_rows", None, "display.max_columns", None, "display.float_format", "{:.1f}".format):
+        print(summarize(args.path))
+
+
+if __name__ == "__main__":
+    main()
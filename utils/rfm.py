@@ -0,0 +1,210 @@
+"""
+Cálculo de Recencia, Frecuencia y Monto (RFM) por cliente.
+
+Las tres métricas salen de reducciones nativas del groupby (fecha máxima,
+cantidad de filas y suma del monto); la recencia se deriva después con
+aritmética de fechas sobre un valor por cliente, sin lambdas por grupo.
+
+Para exportaciones que no caben en memoria, `RFMAccumulator` pliega archivos
+leídos por bloques en acumuladores por cliente (última compra, cantidad y
+suma): la memoria depende del número de clientes y del tamaño del bloque, no
+del total de transacciones. Los parciales de cada bloque se guardan y se
+reducen juntos cuando suman `REDUCE_ROWS` filas o tantas como el estado
+acumulado (y al final): el estado no se re-agrupa en cada bloque y cada fila
+por cliente pasa por un número acotado de reducciones.
+
+Uso:
+    python -m utils.rfm archivo transacciones.csv --output rfm.csv
+    python -m utils.rfm benchmark --transactions 50000 5000000 --clients 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.benchmarking import best_of, print_table
+
+CUSTOMER, DATE, AMOUNT = "ID_Cliente", "Fecha_Compra", "Monto_Compra"
+RFM_COLUMNS = ["Recencia", "Frecuencia", "Monetario"]
+CHUNK_ROWS = 1_000_000
+REDUCE_ROWS = 1_000_000  # filas por cliente pendientes antes de reducir
+
+_PARTIALS = {"Ultima_Compra": "max", "Frecuencia": "sum", "Monetario": "sum"}
+
+
+def _partials(transactions, customer, date, amount):
+    """Última compra, cantidad y suma por cliente de un bloque de transacciones."""
+    grouped = transactions.groupby(customer, observed=True, sort=False)
+    return pd.DataFrame({
+        "Ultima_Compra": grouped[date].max(),
+        "Frecuencia": grouped.size(),
+        "Monetario": grouped[amount].sum(),
+    })
+
+
+def _finish(partials, today, customer):
+    """Recencia en días contra `today` (por defecto, el día después de la última compra registrada)."""
+    last = partials["Ultima_Compra"]
+    if today is None:
+        today = last.max() + pd.Timedelta(days=1)
+    rfm = pd.DataFrame({
+        "Recencia": (pd.Timestamp(today) - last).dt.days,
+        "Frecuencia": partials["Frecuencia"].astype(np.int64),
+        "Monetario": partials["Monetario"],
+    })
+    rfm.index.name = customer
+    return rfm.sort_index().reset_index()
+
+
+def compute_rfm(transactions, today=None, customer=CUSTOMER, date=DATE, amount=AMOUNT):
+    """RFM de un frame de transacciones en memoria: una fila por cliente."""
+    return _finish(_partials(transactions, customer, date, amount), today, customer)
+
+
+def _reduce(partials):
+    return pd.concat(partials).groupby(level=0, sort=False).agg(_PARTIALS)
+
+
+class RFMAccumulator:
+    """Acumula RFM por cliente a partir de bloques de transacciones."""
+
+    def __init__(self, customer=CUSTOMER, date=DATE, amount=AMOUNT):
+        self.customer, self.date, self.amount = customer, date, amount
+        self.state = None
+        self.pending = []  # parciales por bloque aún no reducidos
+        self.pending_rows = 0
+        self.rows = 0
+
+    def update(self, chunk):
+        partials = _partials(chunk, self.customer, self.date, self.amount)
+        if isinstance(partials.index, pd.CategoricalIndex):
+            # Cada bloque puede traer otras categorías: los acumuladores se indexan por el valor
+            partials.index = partials.index.astype(partials.index.categories.dtype)
+        self.pending.append(partials)
+        self.pending_rows += len(partials)
+        # Lo pendiente alcanza al estado antes de reducir: el costo total queda
+        # proporcional a las filas por cliente de todos los bloques, no a bloques × clientes
+        if self.pending_rows >= max(REDUCE_ROWS, 0 if self.state is None else len(self.state)):
+            self._reduce()
+        self.rows += len(chunk)
+        return self
+
+    def _reduce(self):
+        if self.pending:
+            partials = self.pending if self.state is None else [self.state, *self.pending]
+            self.state = partials[0] if len(partials) == 1 else _reduce(partials)
+            self.pending, self.pending_rows = [], 0
+
+    def result(self, today=None):
+        self._reduce()
+        if self.state is None:
+            return pd.DataFrame(columns=[self.customer, *RFM_COLUMNS])
+        return _finish(self.state, today, self.customer)
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS, customer=CUSTOMER, date=DATE, amount=AMOUNT):
+    """Bloques de un CSV o Parquet con solo las columnas de RFM y la fecha ya convertida."""
+    columns = [customer, date, amount]
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            chunk = batch.to_pandas()
+            chunk[date] = pd.to_datetime(chunk[date])
+            yield chunk
+        return
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows,
+                             dtype={customer: "category", amount: "float64"}):
+        chunk[date] = pd.to_datetime(chunk[date])
+        yield chunk
+
+
+def rfm_from_files(paths, today=None, chunk_rows=CHUNK_ROWS, customer=CUSTOMER, date=DATE, amount=AMOUNT):
+    """RFM de uno o varios archivos de transacciones leídos por bloques."""
+    accumulator = RFMAccumulator(customer, date, amount)
+    for path in [paths] if isinstance(paths, str) else paths:
+        for chunk in read_chunks(path, chunk_rows, customer, date, amount):
+            accumulator.update(chunk)
+    return accumulator.result(today)
+
+
+def _rfm_lambda(transactions):
+    """El cálculo anterior de la página, con una lambda por cliente para la recencia."""
+    today = transactions[DATE].max() + pd.Timedelta(days=1)
+    rfm = transactions.groupby(CUSTOMER, observed=True).agg({
+        DATE: lambda fecha: (today - fecha.max()).days,
+        CUSTOMER: "count",
+        AMOUNT: "sum",
+    }).rename(columns={DATE: "Recencia", CUSTOMER: "Frecuencia", AMOUNT: "Monetario"})
+    return rfm.reset_index()
+
+
+def _same_rfm(expected, got):
+    expected = expected.assign(**{CUSTOMER: expected[CUSTOMER].astype(str)}).set_index(CUSTOMER).sort_index()
+    got = got.assign(**{CUSTOMER: got[CUSTOMER].astype(str)}).set_index(CUSTOMER).sort_index()
+    assert expected.index.equals(got.index)
+    assert (expected["Recencia"].to_numpy() == got["Recencia"].to_numpy()).all()
+    assert (expected["Frecuencia"].to_numpy() == got["Frecuencia"].to_numpy()).all()
+    assert np.allclose(expected["Monetario"].to_numpy(), got["Monetario"].to_numpy())
+
+
+def benchmark(transactions, n_clients=5000, chunk_rows=CHUNK_ROWS, lambda_limit=1_000_000, repeats=3):
+    """Lambda por cliente vs reducciones nativas en memoria vs lectura por bloques de un CSV."""
+    from utils.customer_simulation import simulate_transactions
+
+    results = []
+    for n in transactions:
+        frame = simulate_transactions(n_clients, n, seed=0)
+        native, native_seconds = best_of(lambda: compute_rfm(frame), repeats)
+
+        lambda_seconds = None
+        if n <= lambda_limit:
+            legacy, lambda_seconds = best_of(lambda: _rfm_lambda(frame), 1)
+            _same_rfm(legacy, native)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "transacciones.csv")
+            frame.to_csv(path, index=False)
+            start = time.perf_counter()
+            streamed = rfm_from_files(path, chunk_rows=chunk_rows)
+            stream_seconds = time.perf_counter() - start
+        _same_rfm(native, streamed)
+        results.append({"transacciones": n, "lambda_s": lambda_seconds, "nativo_s": native_seconds,
+                        "bloques_s": stream_seconds})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RFM por cliente, en memoria o por bloques.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    files = sub.add_parser("archivo", help="RFM de archivos CSV o Parquet leídos por bloques")
+    files.add_argument("paths", nargs="+")
+    files.add_argument("--output", default="rfm.csv")
+    files.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    files.add_argument("--today", help="Fecha de referencia de la recencia (por defecto, el día después de la última compra)")
+    bench = sub.add_parser("benchmark", help="Lambda por cliente vs reducciones nativas vs bloques")
+    bench.add_argument("--transactions", type=int, nargs="+", default=[50_000, 1_000_000, 5_000_000])
+    bench.add_argument("--clients", type=int, default=5000)
+    bench.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.command == "archivo":
+        start = time.perf_counter()
+        rfm = rfm_from_files(args.paths, today=args.today, chunk_rows=args.chunk_rows)
+        rfm.to_csv(args.output, index=False)
+        print(f"{len(rfm):,} clientes en {time.perf_counter() - start:.2f} s -> {args.output}")
+        return
+
+    print_table(benchmark(args.transactions, args.clients, args.chunk_rows), [
+        ("transacciones", "transacciones", ",", 1),
+        ("lambda (s)", "lambda_s", ".3f", 1),
+        ("nativo (s)", "nativo_s", ".3f", 1),
+        ("bloques CSV (s)", "bloques_s", ".3f", 1),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Preparación única del frame de ventas del cuadro de control.
+
+El cruce con el catálogo y las columnas derivadas (fecha, año, trimestre,
+revenue y márgenes) se calculan una vez por versión de los datos, con tipos
+compactos: `Year` como entero pequeño y `Quarter` / `Category` como
+categóricas. El trimestre se arma a partir de los códigos numéricos y solo se
+formatea como texto una vez por trimestre distinto, no por fila.
+
+Uso:
+    python -m utils.sales_prep --rows 1000000 3000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.benchmarking import best_of, print_table, synthetic_catalog, synthetic_sales
+from utils.dimension import ProductDimension
+
+
+def quarter_labels(dates):
+    """Categórica ordenada "2023Q1", "2023Q2", ... sin convertir cada fila a texto."""
+    valid = dates.notna().to_numpy()
+    codes = np.full(len(dates), -1, dtype=np.int32)
+    if not valid.any():
+        return pd.Categorical.from_codes(codes, categories=[], ordered=True)
+    years = dates.dt.year.to_numpy()[valid].astype(np.int64)
+    keys = years * 4 + dates.dt.quarter.to_numpy()[valid].astype(np.int64) - 1
+    first = keys.min()
+    # Los trimestres forman un rango corto: se renumeran los presentes sin ordenar las filas
+    present = np.bincount(keys - first) > 0
+    codes[valid] = (np.cumsum(present) - 1)[keys - first]
+    labels = [f"{key // 4}Q{key % 4 + 1}" for key in np.flatnonzero(present) + first]
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+def prepare_sales(sales, products, how="right"):
+    """
+    Cruza ventas y catálogo (un DataFrame o una `ProductDimension` ya indexada)
+    y agrega las columnas derivadas que usa el dashboard.
+    """
+    dimension = products if isinstance(products, ProductDimension) else ProductDimension(products)
+    df = dimension.join(sales, how=how)
+
+    df["Date"] = pd.to_datetime(df["Date"])
+    year = df["Date"].dt.year
+    df["Year"] = year.astype("int16" if year.notna().all() else "Int16")
+    df["Quarter"] = quarter_labels(df["Date"])
+    df["Category"] = df["Category"].astype("category")
+
+    df["RevenuePotential"] = df["Price"] * df["StockLevel"]
+    df["Profit"] = df["Price"] - df["Cost"]
+    df["Margin"] = df["Profit"] / df["Price"] * 100
+    return df
+
+
+def append_prepared(frame, new_rows):
+    """
+    Agrega filas ya preparadas conservando las categóricas: las categorías nuevas
+    se suman al final (y se reordenan si la categórica es ordenada), así que
+    solo se remapean códigos enteros y nunca se vuelven a hashear los textos.
+    """
+    if frame is None or frame.empty:
+        return new_rows.reset_index(drop=True)
+    columns = {}
+    for column in frame.columns:
+        old, new = frame[column], new_rows[column]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            new = new.astype("category")
+            categories = old.cat.categories.append(new.cat.categories.difference(old.cat.categories))
+            if old.cat.ordered:
+                categories = categories.sort_values()
+            if not categories.equals(old.cat.categories):
+                old = old.cat.set_categories(categories)
+            new = new.cat.set_categories(categories, ordered=old.cat.ordered)
+        columns[column] = pd.concat([old, new], ignore_index=True)
+    # concat por columnas (axis=1) no consolida bloques: evita copiar el frame completo otra vez
+    return pd.concat(list(columns.values()), axis=1, keys=list(columns))
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def prepared_sales(data_version, _sales, _products):
+    """`prepare_sales` una vez por versión de los datos (p. ej. las generaciones de los blobs)."""
+    return prepare_sales(_sales, _products)
+
+
+def _per_rerun(sales, products):
+    """La ruta anterior, repetida en cada rerun de la página."""
+    df = pd.merge(sales, products, on="ProductID", how="right")
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["Year"] = df["Date"].dt.year
+    df["Quarter"] = df["Date"].dt.to_period("Q").astype(str)
+    df["RevenuePotential"] = df["Price"] * df["StockLevel"]
+    return df
+
+
+def benchmark(rows, repeats=3):
+    results = []
+    for n in rows:
+        sales, catalog = synthetic_sales(n), synthetic_catalog()
+        before, rerun_before = best_of(lambda: _per_rerun(sales, catalog), repeats)
+        after, first = best_of(lambda: prepare_sales(sales, catalog), repeats)
+
+        version = ("benchmark", n)
+        prepared_sales(version, sales, catalog)
+        _, rerun_after = best_of(lambda: prepared_sales(version, sales, catalog), repeats)
+
+        # El cruce indexado conserva el orden de las ventas; pd.merge(how="right") el del catálogo
+        expected = before["Quarter"].value_counts().sort_index()
+        got = after["Quarter"].astype(str).value_counts().sort_index()
+        assert (expected.index == got.index).all() and (expected.to_numpy() == got.to_numpy()).all()
+        results.append({
+            "filas": n,
+            "antes_s": rerun_before,
+            "antes_mb": before.memory_usage(deep=True).sum() / 1e6,
+            "primera_s": first,
+            "rerun_s": rerun_after,
+            "despues_mb": after.memory_usage(deep=True).sum() / 1e6,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la preparación del frame de ventas.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 3_000_000])
+    args = parser.parse_args()
+
+    print_table(benchmark(args.rows), [
+        ("filas", "filas", ",", 1),
+        ("antes/rerun (s)", "antes_s", ".3f", 1),
+        ("antes (MB)", "antes_mb", ".0f", 1),
+        ("1ª vez (s)", "primera_s", ".3f", 1),
+        ("rerun (ms)", "rerun_s", ".3f", 1e3),
+        ("después (MB)", "despues_mb", ".0f", 1),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Gráfico 3D de clusters con nivel de detalle acotado.
+
+`px.scatter_3d` sobre todo el frame manda cada cliente al navegador. Aquí cada
+cluster se recorta a `max_per_cluster` puntos: se conservan siempre los
+extremos de cada eje (mínimo y máximo de R, F y M en el cluster) y el resto
+es una muestra aleatoria dentro del cluster. Encima se dibujan los centroides.
+Las coordenadas viajan como arreglos tipados (enteros pequeños y `float32`),
+que plotly serializa en binario base64 en lugar de listas de números en
+texto. Así la carga queda acotada por `K × max_per_cluster`, no por el
+número de clientes.
+
+Uso:
+    python -m utils.scatter_lod --clients 5000 50000 1000000
+"""
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.clustering import random_rank_within_groups
+
+MAX_PER_CLUSTER = 1500
+RANDOM_STATE = 42
+
+
+@dataclass
+class LODScatter:
+    figure: go.Figure
+    drawn: int
+    total: int
+    payload_bytes: int = None
+
+
+def lod_positions(frame, columns, cluster_column="Cluster", max_per_cluster=MAX_PER_CLUSTER,
+                  random_state=RANDOM_STATE):
+    """Posiciones de las filas a dibujar: extremos por eje y muestra de cada cluster, hasta el tope."""
+    clusters = frame[cluster_column].to_numpy()
+    codes, uniques = pd.factorize(clusters, sort=True)
+    rng = np.random.default_rng(random_state)
+
+    order, rank, _ = random_rank_within_groups(codes, rng)
+
+    keep = np.zeros(len(codes), dtype=bool)
+    # Extremos de cada eje por cluster (como posiciones): el contorno de cada segmento se ve siempre
+    grouped = frame[columns].reset_index(drop=True).groupby(codes, sort=True)
+    extremes = np.unique(np.r_[grouped.idxmin().to_numpy().ravel(), grouped.idxmax().to_numpy().ravel()])
+    keep[extremes] = True
+    extras_per_cluster = np.bincount(codes[extremes], minlength=len(uniques))
+    quota = np.maximum(max_per_cluster - extras_per_cluster, 0)
+    sampled = order[rank < quota[codes[order]]]
+    keep[sampled] = True
+    return np.flatnonzero(keep)
+
+
+def _compact(values):
+    """Enteros al tipo más chico que los contiene; reales a float32."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return pd.to_numeric(pd.Series(values), downcast="integer").to_numpy()
+    return values.astype(np.float32)
+
+
+def scatter_3d_lod(frame, x, y, z, cluster_column="Cluster", centroids=None,
+                   max_per_cluster=MAX_PER_CLUSTER, title=None, measure_payload=False):
+    """Figura 3D con un trazo por cluster (puntos acotados) y, si se dan, los centroides encima."""
+    columns = [x, y, z]
+    positions = lod_positions(frame, columns, cluster_column, max_per_cluster)
+    drawn = frame.iloc[positions]
+    colors = px.colors.qualitative.Plotly
+
+    figure = go.Figure()
+    clusters = drawn[cluster_column].to_numpy()
+    for i, cluster in enumerate(np.unique(frame[cluster_column].to_numpy())):
+        part = drawn[clusters == cluster]
+        figure.add_trace(go.Scatter3d(
+            x=_compact(part[x]), y=_compact(part[y]), z=_compact(part[z]),
+            mode="markers", name=str(cluster), legendgroup=str(cluster),
+            marker=dict(size=4, opacity=0.8, color=colors[i % len(colors)]),
+        ))
+    if centroids is not None:
+        centroids = np.asarray(centroids, dtype=np.float32)
+        figure.add_trace(go.Scatter3d(
+            x=centroids[:, 0], y=centroids[:, 1], z=centroids[:, 2],
+            mode="markers", name="Centroides",
+            marker=dict(size=9, symbol="diamond", color="black", line=dict(width=1, color="white")),
+        ))
+    figure.update_layout(
+        title=title, legend_title_text=cluster_column,
+        scene=dict(xaxis_title=x, yaxis_title=y, zaxis_title=z),
+    )
+    payload = len(pio.to_json(figure, validate=False)) if measure_payload else None
+    return LODScatter(figure, len(positions), len(frame), payload)
+
+
+def _synthetic_rfm(n_clients, k=4, seed=0):
+    rng = np.random.default_rng(seed)
+    cluster = rng.integers(0, k, n_clients)
+    return pd.DataFrame({
+        "Recencia": rng.integers(1, 365, n_clients),
+        "Frecuencia": rng.poisson(5 + 5 * cluster) + 1,
+        "Monetario": rng.gamma(2.0, 200.0 * (cluster + 1)).round(2),
+        "Cluster": cluster,
+    })
+
+
+def benchmark(clients, max_per_cluster=MAX_PER_CLUSTER):
+    """Tamaño del JSON y tiempo de armado: `px.scatter_3d` con todos los puntos vs la versión acotada."""
+    results = []
+    for n in clients:
+        frame = _synthetic_rfm(n)
+        start = time.perf_counter()
+        full = px.scatter_3d(frame, x="Recencia", y="Frecuencia", z="Monetario", color=frame["Cluster"].astype(str))
+        full_bytes = len(pio.to_json(full, validate=False))
+        full_seconds = time.perf_counter() - start
+
+        centroids = frame.groupby("Cluster")[["Recencia", "Frecuencia", "Monetario"]].mean().to_numpy()
+        start = time.perf_counter()
+        lod = scatter_3d_lod(frame, "Recencia", "Frecuencia", "Monetario", centroids=centroids,
+                             max_per_cluster=max_per_cluster, measure_payload=True)
+        lod_seconds = time.perf_counter() - start
+
+        drawn = frame.iloc[lod_positions(frame, ["Recencia", "Frecuencia", "Monetario"], max_per_cluster=max_per_cluster)]
+        assert len(drawn) == lod.drawn and drawn["Cluster"].value_counts().max() <= max_per_cluster
+        # Los extremos de cada cluster siempre se dibujan
+        assert drawn.groupby("Cluster")["Monetario"].max().equals(frame.groupby("Cluster")["Monetario"].max())
+        results.append({"clientes": n, "dibujados": lod.drawn, "completo_kb": full_bytes / 1e3,
+                        "completo_s": full_seconds, "lod_kb": lod.payload_bytes / 1e3, "lod_s": lod_seconds})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gráfico 3D con todos los puntos vs nivel de detalle acotado.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[5_000, 50_000, 1_000_000])
+    parser.add_argument("--max-per-cluster", type=int, default=MAX_PER_CLUSTER)
+    args = parser.parse_args()
+
+    print(f"{'clientes':>11}{'dibujados':>11}{'completo (KB)':>15}{'completo (s)':>14}{'acotado (KB)':>14}{'acotado (s)':>13}")
+    for r in benchmark(args.clients, args.max_per_cluster):
+        print(f"{r['clientes']:>11,}{r['dibujados']:>11,}{r['completo_kb']:>15,.0f}{r['completo_s']:>14.3f}"
+              f"{r['lod_kb']:>14,.0f}{r['lod_s']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Tabla de detalle paginada en el servidor.
+
+`TablePager` trabaja sobre las posiciones de las filas filtradas de un frame
+cacheado: no copia el frame ni convierte valores a texto. El orden se calcula
+una vez por columna y dirección, la fila a destacar (p. ej. el mayor revenue)
+una sola vez como posición, y al navegador solo viaja la página visible, con
+tipos numéricos y el formato a cargo de `column_config`.
+"""
+import math
+
+import numpy as np
+import streamlit as st
+
+PAGE_SIZES = (25, 50, 100, 250)
+HIGHLIGHT_COLUMN = "★"
+
+
+class TablePager:
+    def __init__(self, frame, positions, highlight_column=None):
+        self.frame = frame
+        self.positions = np.asarray(positions)
+        self.highlight = None
+        if highlight_column is not None and len(self.positions):
+            values = frame[highlight_column].to_numpy()[self.positions]
+            if not np.isnan(values).all():
+                self.highlight = self.positions[np.nanargmax(values)]
+        self._orders = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def order(self, column=None, ascending=True):
+        """Posiciones ordenadas por `column`; se calcula una vez por columna y dirección."""
+        if column is None:
+            return self.positions
+        key = (column, ascending)
+        if key not in self._orders:
+            values = self.frame[column].iloc[self.positions].reset_index(drop=True)
+            ranks = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            self._orders[key] = self.positions[ranks]
+        return self._orders[key]
+
+    def page_count(self, page_size):
+        return max(math.ceil(len(self) / page_size), 1)
+
+    def page(self, number, page_size, column=None, ascending=True, columns=None):
+        """Solo las filas de la página `number` (desde 1), con la marca de la fila destacada."""
+        start = (number - 1) * page_size
+        rows = self.order(column, ascending)[start:start + page_size]
+        page = self.frame.iloc[rows]
+        if columns is not None:
+            page = page[columns]
+        return page.assign(**{HIGHLIGHT_COLUMN: rows == self.highlight})
+
+    def page_of_highlight(self, page_size, column=None, ascending=True):
+        if self.highlight is None:
+            return None
+        rank = np.flatnonzero(self.order(column, ascending) == self.highlight)[0]
+        return rank // page_size + 1
+
+
+def mostrar_tabla_paginada(pager, columns, column_config=None, key="tabla", highlight_label="Destacada"):
+    if not len(pager):
+        st.info("No hay filas para los filtros seleccionados.")
+        return
+
+    sort_col, direction_col, size_col, page_col = st.columns([3, 2, 2, 2])
+    with sort_col:
+        column = st.selectbox("Ordenar por", [None, *columns], key=f"{key}_orden",
+                              format_func=lambda c: "Sin ordenar" if c is None else c)
+    with direction_col:
+        ascending = st.radio("Dirección", ["Ascendente", "Descendente"], horizontal=True,
+                             key=f"{key}_direccion") == "Ascendente"
+    with size_col:
+        page_size = st.selectbox("Filas por página", PAGE_SIZES, index=1, key=f"{key}_tamano")
+    with page_col:
+        pages = pager.page_count(page_size)
+        # Al cambiar filtros o tamaño de página, la página guardada puede quedar fuera de rango
+        if st.session_state.get(f"{key}_pagina", 1) > pages:
+            st.session_state[f"{key}_pagina"] = pages
+        number = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages,
+                                 step=1, key=f"{key}_pagina")
+
+    page = pager.page(number, page_size, column, ascending, columns)
+    config = {HIGHLIGHT_COLUMN: st.column_config.CheckboxColumn(highlight_label, width="small"),
+              **(column_config or {})}
+    st.dataframe(page, column_config=config, column_order=[HIGHLIGHT_COLUMN, *columns],
+                 use_container_width=True, hide_index=True)
+
+    start = (number - 1) * page_size
+    caption = f"Filas {start + 1:,}–{min(start + page_size, len(pager)):,} de {len(pager):,}"
+    highlight_page = pager.page_of_highlight(page_size, column, ascending)
+    if highlight_page is not None:
+        caption += f" · {highlight_label.lower()}: página {highlight_page}"
+    st.caption(caption)